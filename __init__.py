@@ -1,14 +1,17 @@
 import bpy
 from bpy.app.handlers import persistent
 from .bin import pyluxcore
-from .export.image import ImageExporter
+from .export.image import ImageExporter, ImagePixelCache, ImageSequencePrefetcher
+from .export.motion_blur import TransformCache
+from .export.caches import SmokeCache
 from .utils import compatibility
+from .utils.node import NodeExportMemo, NodeTreeIndex
 
 # Have to import everything with classes which need to be registered
 from . import engine, nodes, operators, properties, ui
 from .nodes import materials, volumes, textures
 from .ui import (blender_object, camera, config, display, errorlog,
-                 halt, light, material, mesh, particle, postpro, texture, world)
+                 halt, light, material, mesh, particle, postpro, profiler, texture, world)
 
 bl_info = {
     "name": "LuxCore",
@@ -32,6 +35,13 @@ def blendluxcore_exit():
 def luxcore_load_post(_):
     """ Note: the only argument Blender passes is always None """
 
+    # Cached pixels belong to the images of the previous file
+    ImagePixelCache.clear()
+    SmokeCache.clear()
+    NodeExportMemo.clear()
+    NodeTreeIndex.clear()
+    ImageExporter.delete_unused_temp_images()
+
     # Update OpenCL devices if .blend is opened on a different computer than it was saved on
     for scene in bpy.data.scenes:
         scene.luxcore.opencl.update_devices_if_necessary()
@@ -44,8 +54,40 @@ def luxcore_load_post(_):
     compatibility.run()
 
 
+@persistent
+def luxcore_render_init(_):
+    # Motion blur samples are only valid during one render job
+    TransformCache.clear()
+    # The simulation might have been changed without an update of the domain (e.g. by a bake)
+    SmokeCache.clear()
+
+
+@persistent
+def luxcore_render_finished(_):
+    """ Called when a render job is completed or cancelled """
+    TransformCache.clear()
+    # The temp images of this render may be deleted now
+    ImageExporter.release_temp_images()
+    # Don't keep data of every image ever rendered for the whole Blender session
+    ImageExporter.clear_image_hashes()
+    ImagePixelCache.clear()
+    ImageSequencePrefetcher.clear()
+    # Release the last exported properties
+    NodeExportMemo.clear()
+
+
+@persistent
+def luxcore_undo_redo_post(_):
+    # Undo and redo reload all datablocks, the cached nodes and images are invalid
+    NodeTreeIndex.clear()
+    ImageExporter.clear_in_memory_images()
+
+
 @persistent
 def luxcore_scene_update_post(scene):
+    SmokeCache.update(scene)
+    ImagePixelCache.update()
+
     for mat in bpy.data.materials:
         node_tree = mat.luxcore.node_tree
 
@@ -61,6 +103,11 @@ def register():
 
     bpy.app.handlers.load_post.append(luxcore_load_post)
     bpy.app.handlers.scene_update_post.append(luxcore_scene_update_post)
+    bpy.app.handlers.render_init.append(luxcore_render_init)
+    bpy.app.handlers.render_complete.append(luxcore_render_finished)
+    bpy.app.handlers.render_cancel.append(luxcore_render_finished)
+    bpy.app.handlers.undo_post.append(luxcore_undo_redo_post)
+    bpy.app.handlers.redo_post.append(luxcore_undo_redo_post)
 
     nodes.materials.register()
     nodes.textures.register()
@@ -78,6 +125,11 @@ def register():
 def unregister():
     bpy.app.handlers.load_post.remove(luxcore_load_post)
     bpy.app.handlers.scene_update_post.remove(luxcore_scene_update_post)
+    bpy.app.handlers.render_init.remove(luxcore_render_init)
+    bpy.app.handlers.render_complete.remove(luxcore_render_finished)
+    bpy.app.handlers.render_cancel.remove(luxcore_render_finished)
+    bpy.app.handlers.undo_post.remove(luxcore_undo_redo_post)
+    bpy.app.handlers.redo_post.remove(luxcore_undo_redo_post)
 
     ui.unregister()
     nodes.materials.unregister()
@@ -1,10 +1,13 @@
 from time import time
 from ..bin import pyluxcore
 from .. import utils
+from ..utils import node as utils_node
 from . import (
     blender_object, caches, camera, config, duplis,
     imagepipeline, light, material, motion_blur, particle, world
 )
+from .image import ImageExporter, ImageExportSettings
+from .importance import LightImportanceEstimator
 from .light import WORLD_BACKGROUND_LIGHT_NAME
 
 
@@ -41,31 +44,55 @@ class Exporter(object):
         self.config_cache = caches.StringCache()
         self.camera_cache = caches.CameraCache()
         self.object_cache = caches.ObjectCache()
+        self.lamp_cache = caches.LampCache()
         self.material_cache = caches.MaterialCache()
+        self.definition_cache = caches.DefinitionCache()
         self.visibility_cache = caches.VisibilityCache()
         self.world_cache = caches.WorldCache()
         self.imagepipeline_cache = caches.StringCache()
         # This dict contains ExportedObject and ExportedLight instances
         self.exported_objects = {}
+        self.image_settings = ImageExportSettings()
 
     def create_session(self, scene, context=None, engine=None):
         # Notes:
         # In final render, context is None
         # In viewport render, engine is None (we can't show messages or check test_break() anyway)
 
+        display = scene.luxcore.display
+        self.image_settings = ImageExportSettings(
+            # Only the filesaver engine needs packed and generated images as files
+            write_files=context is None and scene.luxcore.config.use_filesaver,
+            # The viewport uses downscaled copies of large textures, final renders the originals
+            proxy_size=display.texture_proxy_size if context and display.use_texture_proxies else 0,
+            # Load upcoming frames of image sequences in the background while the current frame renders
+            prefetch_frames=2 if engine and engine.is_animation else 0,
+        )
+
+        with ImageExporter.use_settings(self.image_settings):
+            return self._create_session(scene, context, engine)
+
+    def _create_session(self, scene, context, engine):
         print("create_session")
         scene.luxcore.errorlog.clear()
         start = time()
+        utils_node.ConstantFolding.reset()
+        light.IESCache.reset()
+        # Viewport edits redefine the textures under their usual names
+        utils_node.TextureDeduplication.reset(enabled=context is None)
+        utils_node.NodeExportProfiler.reset(scene.luxcore.profiler.enable)
         # Scene
         luxcore_scene = pyluxcore.Scene()
         scene_props = pyluxcore.Properties()
 
         # Camera (needs to be parsed first because it is needed for hair tesselation)
         self.camera_cache.diff(scene, context)  # Init camera cache
-        luxcore_scene.Parse(self.camera_cache.props)
+        ImageExporter.parse(luxcore_scene, self.camera_cache.props)
 
         # Objects and lamps
         objs = context.visible_objects if context else scene.objects
+        # Has to run before the lamps are exported
+        LightImportanceEstimator.update(scene, context)
         len_objs = len(objs)
 
         for index, obj in enumerate(objs, start=1):
@@ -103,7 +130,11 @@ class Exporter(object):
         world_props = world.convert(scene)
         scene_props.Set(world_props)
 
-        luxcore_scene.Parse(scene_props)
+        if context:
+            # Material edits in the viewport only send the definitions that differ from these
+            self.definition_cache.add(scene_props)
+
+        ImageExporter.parse(luxcore_scene, scene_props)
 
         # Regularly check if we should abort the export (important in heavy scenes)
         if engine and engine.test_break():
@@ -129,6 +160,15 @@ class Exporter(object):
 
         export_time = time() - start
         print("Export took %.1fs" % export_time)
+        if utils_node.ConstantFolding.removed:
+            print("Constant folding removed %d texture nodes" % utils_node.ConstantFolding.removed)
+        if utils_node.TextureDeduplication.reused:
+            print("%d identical textures were merged" % utils_node.TextureDeduplication.reused)
+        if utils_node.NodeExportProfiler.enabled:
+            scene.luxcore.profiler.update_results()
+
+        if caches.TempMeshCache.live_count:
+            print("WARNING: %d temporary meshes still alive after export" % caches.TempMeshCache.live_count)
 
         if engine:
             if config_props.Get("renderengine.type").GetString().endswith("OCL"):
@@ -189,8 +229,10 @@ class Exporter(object):
             session.BeginSceneEdit()
 
             try:
-                props = self._update_scene(context, changes, luxcore_scene)
-                luxcore_scene.Parse(props)
+                light.IESCache.reset()
+                with ImageExporter.use_settings(self.image_settings):
+                    props = self._update_scene(context, changes, luxcore_scene)
+                ImageExporter.parse(luxcore_scene, props)
             except Exception as error:
                 context.scene.luxcore.errorlog.add_error(error)
                 import traceback
@@ -204,7 +246,7 @@ class Exporter(object):
                 props = pyluxcore.Properties()
                 props.Set(pyluxcore.Property("scene.lights.__SAVIOR__.type", "constantinfinite"))
                 props.Set(pyluxcore.Property("scene.lights.__SAVIOR__.color", [0, 0, 0]))
-                luxcore_scene.Parse(props)
+                ImageExporter.parse(luxcore_scene, props)
                 # Try again
                 session.EndSceneEdit()
 
@@ -236,25 +278,29 @@ class Exporter(object):
             # We need the previously exported mesh defintions
             old_exported_obj = self.exported_objects[key]
 
-        # Note: exported_obj can also be an instance of ExportedLight, but they behave the same
-        obj_props, exported_obj = blender_object.convert(obj, scene, context, luxcore_scene, old_exported_obj,
-                                                         update_mesh, dupli_suffix)
-
-        # Convert particles and dupliverts/faces
-        if obj.is_duplicator:
-            duplis.convert(obj, scene, context, luxcore_scene, engine)
-
-        # When moving a duplicated object, update the parent, too (concerns dupliverts/faces)
-        if obj.parent and obj.parent.is_duplicator:
-            self._convert_object(props, obj.parent, scene, context, luxcore_scene)
-
-        # Convert hair
-        for psys in obj.particle_systems:
-            settings = psys.settings
-            # render_type OBJECT and GROUP are handled by duplis.convert() above
-            if settings.type == "HAIR" and settings.render_type == "PATH":
-                particle.convert_hair(obj, psys, luxcore_scene, scene, context, engine)
-                
+        # All meshes created with to_mesh() during the export of this object are
+        # shared between the exporters and removed when leaving this block
+        with caches.TempMeshCache(scene, context) as temp_meshes:
+            # Note: exported_obj can also be an instance of ExportedLight, but they behave the same
+            obj_props, exported_obj = blender_object.convert(obj, scene, context, luxcore_scene, old_exported_obj,
+                                                             update_mesh, dupli_suffix, temp_meshes)
+
+            # Convert particles and dupliverts/faces
+            if obj.is_duplicator:
+                duplis.convert(obj, scene, context, luxcore_scene, temp_meshes, engine)
+
+            # When moving a duplicated object, update the parent, too (concerns dupliverts/faces)
+            if obj.parent and obj.parent.is_duplicator:
+                self._convert_object(props, obj.parent, scene, context, luxcore_scene)
+
+            # Convert hair
+            for psys in obj.particle_systems:
+                settings = psys.settings
+                # render_type OBJECT and GROUP are handled by duplis.convert() above
+                if settings.type == "HAIR" and settings.render_type == "PATH":
+                    particle.convert_hair(obj, psys, luxcore_scene, scene, temp_meshes, context, engine)
+
+
         if exported_obj is None:
             # Object is not visible or an error happened.
             # In case of an error, it was already reported by blender_object.convert()
@@ -262,8 +308,22 @@ class Exporter(object):
 
         props.Set(obj_props)
         self.exported_objects[key] = exported_obj
+
+        if obj.type == "LAMP" and context:
+            # Enables fast updates of lamp edits in the viewport
+            self.lamp_cache.add(obj, obj_props, context)
         return exported_obj
 
+    def _update_lamp(self, props, obj, context, luxcore_scene, transform_only):
+        lamp_props = self.lamp_cache.update(obj, context.scene, context, transform_only)
+
+        if lamp_props is None:
+            print("lamp changed:", obj.name)
+            self._convert_object(props, obj, context.scene, context, luxcore_scene)
+        else:
+            print("lamp %s changed:" % ("transform" if transform_only else "gain"), obj.name)
+            props.Set(lamp_props)
+
     def _update_config(self, session, config_props):
         renderconfig = session.GetRenderConfig()
         session.Stop()
@@ -293,14 +353,17 @@ class Exporter(object):
                 print("mesh changed:", obj.name)
                 self._convert_object(props, obj, context.scene, context, luxcore_scene, update_mesh=True)
 
+            for obj in self.object_cache.moved_lamps:
+                self._update_lamp(props, obj, context, luxcore_scene, transform_only=True)
+
             for obj in self.object_cache.lamps:
-                print("lamp changed:", obj.name)
-                self._convert_object(props, obj, context.scene, context, luxcore_scene)
+                self._update_lamp(props, obj, context, luxcore_scene, transform_only=False)
 
         if changes & Change.MATERIAL:
             for mat in self.material_cache.changed_materials:
                 luxcore_name, mat_props = material.convert(mat, context.scene, context)
-                props.Set(mat_props)
+                # Only the changed textures and material definitions have to be parsed again
+                props.Set(self.definition_cache.diff(mat_props))
 
         if changes & Change.VISIBILITY:
             for key in self.visibility_cache.objects_to_remove:
@@ -338,4 +401,6 @@ class Exporter(object):
             world_props = world.convert(context.scene)
             props.Set(world_props)
 
+        # Materials and volumes might also be exported with objects or the world
+        self.definition_cache.add(props)
         return props
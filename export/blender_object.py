@@ -8,7 +8,10 @@ from . import material
 from .light import convert_lamp
 
 def convert(blender_obj, scene, context, luxcore_scene,
-            exported_object=None, update_mesh=False, dupli_suffix=""):
+            exported_object=None, update_mesh=False, dupli_suffix="", temp_meshes=None):
+    """
+    temp_meshes: caches.TempMeshCache instance, required if update_mesh is True
+    """
 
     if not utils.is_obj_visible(blender_obj, scene, context, is_dupli=dupli_suffix):
         return pyluxcore.Properties(), None
@@ -42,9 +45,8 @@ def convert(blender_obj, scene, context, luxcore_scene,
 
         if update_mesh:
             # print("converting mesh:", blender_obj.data.name)
-            modifier_mode = "PREVIEW" if context else "RENDER"
-            apply_modifiers = True
-            mesh = blender_obj.to_mesh(scene, apply_modifiers, modifier_mode)
+            # The mesh is removed by temp_meshes, even if an exception happens below
+            mesh = temp_meshes.get(blender_obj)
 
             if mesh is None or len(mesh.tessfaces) == 0:
                 # This is not worth a warning in the errorlog
@@ -52,7 +54,6 @@ def convert(blender_obj, scene, context, luxcore_scene,
                 return props, None
 
             mesh_definitions = _convert_mesh_to_shapes(luxcore_name, mesh, luxcore_scene, mesh_transform)
-            bpy.data.meshes.remove(mesh, do_unlink=False)
         else:
             assert exported_object is not None
             print(blender_obj.name + ": Using cached mesh")
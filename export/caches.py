@@ -1,7 +1,9 @@
 import bpy
+from collections import OrderedDict
 from .. import utils
 from ..utils import node as utils_node
-from ..export import smoke, camera
+from ..bin import pyluxcore
+from ..export import smoke, camera, light
 
 class StringCache(object):
     def __init__(self):
@@ -49,7 +51,10 @@ class ObjectCache(object):
     def _reset(self):
         self.changed_transform = []
         self.changed_mesh = []
+        # Lamps with changed settings
         self.lamps = []
+        # Lamps where only the transformation changed
+        self.moved_lamps = []
 
     def diff(self, scene):
         self._reset()
@@ -69,10 +74,56 @@ class ObjectCache(object):
                             self.changed_mesh.append(obj)
                         else:
                             self.changed_transform.append(obj)
-                    elif obj.type == "LAMP":
-                        self.lamps.append(obj)
+                    elif obj.type == "LAMP" and not obj.is_updated_data:
+                        self.moved_lamps.append(obj)
+
+        return self.changed_transform or self.changed_mesh or self.lamps or self.moved_lamps
+
+
+class LampCache(object):
+    """
+    Stores the complete properties of the lamps exported in the viewport, so edits that
+    only change the transformation or the brightness of a lamp can be exported without
+    the expensive parts (images, IES data, area light meshes).
+    LuxCore needs the full definition when a light is parsed again, so the changed
+    properties are merged into the cached ones.
+    """
+    def __init__(self):
+        # {key: (structure, missing_image, props)}
+        self.lamps = {}
+
+    def add(self, obj, props, context):
+        missing_image = light.is_missing_image_fallback(obj, props, context)
+        self.lamps[utils.make_key(obj)] = (light.get_lamp_structure(obj.data), missing_image, props)
+
+    def update(self, obj, scene, context, transform_only):
+        """ Returns the updated props, or None if the lamp has to be converted completely """
+        key = utils.make_key(obj)
+        if key not in self.lamps:
+            return None
+
+        structure, missing_image, cached_props = self.lamps[key]
 
-        return self.changed_transform or self.changed_mesh or self.lamps
+        if transform_only:
+            changed_props = light.convert_lamp_transform(obj, scene, context)
+        else:
+            if light.get_lamp_structure(obj.data) != structure or missing_image:
+                # convert_lamp_gain() would overwrite the gain that signals the missing image
+                return None
+
+            # Only the brightness changed (the lamp might have been moved at the same time)
+            changed_props = light.convert_lamp_transform(obj, scene, context)
+            if changed_props is not None:
+                changed_props.Set(light.convert_lamp_gain(obj, scene, context))
+
+        if changed_props is None:
+            return None
+
+        props = pyluxcore.Properties()
+        props.Set(cached_props)
+        props.Set(changed_props)
+        self.lamps[key] = (structure, missing_image, props)
+        return props
 
 
 class MaterialCache(object):
@@ -109,26 +160,187 @@ class MaterialCache(object):
         return self.changed_materials
 
 
-class SmokeCache(object):
+class DefinitionCache(object):
+    """
+    Stores a fingerprint of each texture, material and volume definition sent to LuxCore
+    in the viewport. When a material is edited, its node tree is converted again, but only
+    the definitions that differ from the last export have to be parsed by LuxCore.
+    A slider change usually only touches the edited texture.
     """
-    Only speeds up viewport updates that are not related to volume updates (e.g. when a material in the scene is edited,
-    this cache prevents that smoke is re-exported and pyluxcore.Properties are set just to check for volume updates.
-    The really expensive operation is *not* the smoke export, but the Property setting.)
-    """    
+    PREFIXES = ("scene.textures", "scene.materials", "scene.volumes")
+    # Definitions with larger properties (e.g. smoke grids) are always sent, a fingerprint would be too slow
+    MAX_PROPERTY_SIZE = 4096
+
     def __init__(self):
-        self.reset()
-    
-    def convert(self, smoke_obj, channel):
-        key = utils.get_luxcore_name(smoke_obj, context) + channel
+        # {definition prefix: fingerprint}
+        self.fingerprints = {}
+
+    def add(self, props):
+        """ Remember the definitions in props as exported """
+        for prefix, definition in self._get_definitions(props).items():
+            self.fingerprints[prefix] = self._get_fingerprint(definition)
+
+    def diff(self, props):
+        """ Returns the definitions in props that changed since they were last exported """
+        changed_props = pyluxcore.Properties()
+
+        for prefix, definition in self._get_definitions(props).items():
+            fingerprint = self._get_fingerprint(definition)
+
+            if fingerprint is None or self.fingerprints.get(prefix) != fingerprint:
+                for prop in definition:
+                    changed_props.Set(prop)
+                self.fingerprints[prefix] = fingerprint
+
+        return changed_props
+
+    def _get_definitions(self, props):
+        """ Groups the properties by definition in one pass, returns {prefix: [property1, ...]} """
+        definitions = {}
+
+        for name in props.GetAllNames():
+            # e.g. "scene.materials.Mat.kd" -> "scene.materials", "Mat", "kd"
+            parts = name.split(".", 3)
+            if len(parts) < 4:
+                continue
+
+            type_prefix = parts[0] + "." + parts[1]
+            if type_prefix in self.PREFIXES:
+                prefix = type_prefix + "." + parts[2]
+                definitions.setdefault(prefix, []).append(props.Get(name))
+
+        return definitions
+
+    def _get_fingerprint(self, definition):
+        for prop in definition:
+            if prop.GetSize() > self.MAX_PROPERTY_SIZE:
+                return None
+        return "\n".join(str(prop) for prop in definition)
+
+
+class SmokeCache(object):
+    """
+    This class is a singleton.
+    Stores exported smoke grids, so e.g. viewport material edits don't read the (possibly
+    multi-hundred-MB) grids from Blender and convert them again. The grids are kept as
+    compact float32 arrays, the least recently used ones are deleted when the memory budget
+    (scene.luxcore.display.smoke_cache_size) is exceeded.
+    """
+    # {key: (nx, ny, nz, grid)}, the least recently used entry comes first
+    cache = OrderedDict()
+    # Memory used by the cached grids, in bytes
+    size = 0
+
+    @classmethod
+    def convert(cls, smoke_obj, channel, scene):
+        """ Returns (nx, ny, nz, grid) like smoke.convert() """
+        smoke_domain_mod = utils.find_smoke_domain_modifier(smoke_obj)
+        if smoke_domain_mod is None:
+            # Let the smoke exporter raise the appropriate error
+            return smoke.convert(smoke_obj, channel)
+
+        key = cls._make_key(smoke_obj, smoke_domain_mod.domain_settings, channel, scene)
+
+        if key in cls.cache:
+            cls.cache.move_to_end(key)
+            return cls.cache[key]
+
+        entry = smoke.convert(smoke_obj, channel)
+        entry_size = cls._get_size(entry)
+        budget = scene.luxcore.display.smoke_cache_size * 1024 ** 2
+
+        if entry_size <= budget:
+            cls.cache[key] = entry
+            cls.size += entry_size
+
+            # Evict the least recently used grids
+            while cls.size > budget:
+                _, evicted = cls.cache.popitem(last=False)
+                cls.size -= cls._get_size(evicted)
+
+        return entry
+
+    @classmethod
+    def update(cls, scene):
+        """
+        Called from the scene_update_post handler, where is_updated_data is valid.
+        If the simulation was changed, the grids of all frames might be outdated.
+        """
+        if not cls.cache or not bpy.data.objects.is_updated:
+            return
+
+        for obj in scene.objects:
+            if obj.is_updated_data:
+                cls.discard(obj)
+
+    @classmethod
+    def discard(cls, smoke_obj):
+        """ Delete all cached grids of this smoke domain """
+        obj_key = utils.make_key(smoke_obj)
+
+        for key in [key for key in cls.cache if key[0] == obj_key]:
+            cls.size -= cls._get_size(cls.cache.pop(key))
+
+    @classmethod
+    def clear(cls):
+        cls.cache.clear()
+        cls.size = 0
+
+    @staticmethod
+    def _make_key(smoke_obj, settings, channel, scene):
+        resolution = (tuple(settings.domain_resolution), settings.use_high_resolution, settings.amplify)
+        return utils.make_key(smoke_obj), channel, scene.frame_current, resolution
+
+    @staticmethod
+    def _get_size(entry):
+        return entry[3].nbytes
+
+
+class TempMeshCache(object):
+    """
+    Scoped manager for the temporary meshes created by Object.to_mesh().
+    Every object is converted at most once per scope (e.g. the mesh is shared by the
+    object and hair export), and all meshes are removed from bpy.data when the scope
+    is left, even if an exception happened during the export.
+
+    with TempMeshCache(scene, context) as temp_meshes:
+        mesh = temp_meshes.get(obj)
+    """
+    # Number of temporary meshes that are currently alive (for leak monitoring)
+    live_count = 0
+
+    def __init__(self, scene, context=None):
+        self.scene = scene
+        self.modifier_mode = "PREVIEW" if context else "RENDER"
+        self._meshes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def get(self, obj):
+        """ Note: can return None, e.g. for empties or curves without geometry """
+        key = utils.make_key(obj)
+
+        if key not in self._meshes:
+            apply_modifiers = True
+            mesh = obj.to_mesh(self.scene, apply_modifiers, self.modifier_mode)
 
-        if key not in cls.cache:
-            self.cache[key] = smoke.convert(smoke_obj, channel)
+            if mesh is not None:
+                TempMeshCache.live_count += 1
+            self._meshes[key] = mesh
 
-        return self.cache[key]
+        return self._meshes[key]
 
-    def reset(self):
-        self.cache = {}
+    def release(self):
+        for mesh in self._meshes.values():
+            if mesh is not None:
+                bpy.data.meshes.remove(mesh, do_unlink=False)
+                TempMeshCache.live_count -= 1
 
+        self._meshes = {}
 
 
 class VisibilityCache(object):
@@ -3,6 +3,7 @@ from mathutils import Vector, Matrix
 from ..bin import pyluxcore
 from .. import utils
 from ..nodes.output import get_active_output
+from ..utils.node import NodeExportProfiler
 
 
 def convert(scene, context=None, is_camera_moving=False):
@@ -243,7 +244,8 @@ def _get_volume_props(scene):
         active_output = get_active_output(volume_node_tree)
 
         try:
-            active_output.export(props, luxcore_name)
+            with NodeExportProfiler.measure_node_tree(volume_node_tree.name):
+                NodeExportProfiler.export_node(active_output, props, luxcore_name)
             props.Set(pyluxcore.Property("scene.camera.volume", luxcore_name))
         except Exception as error:
             msg = 'Camera: %s' % error
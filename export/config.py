@@ -4,6 +4,7 @@ import bpy
 from ..bin import pyluxcore
 from .. import utils
 from . import aovs
+from .importance import LightImportanceEstimator
 
 
 def convert(scene, context=None):
@@ -90,6 +91,12 @@ def convert(scene, context=None):
         if config.filter == "GAUSSIAN":
             definitions["film.filter.gaussian.alpha"] = config.gaussian_alpha
 
+        # Light strategy
+        light_strategy = config.light_strategy
+        if light_strategy == "AUTO":
+            light_strategy = LightImportanceEstimator.get_light_strategy()
+        definitions["lightstrategy.type"] = light_strategy
+
         use_filesaver = context is None and config.use_filesaver
 
         # Transparent film settings
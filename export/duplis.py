@@ -1,6 +1,7 @@
 from ..bin import pyluxcore
 from .. import utils
 from . import blender_object
+from .image import ImageExporter
 from time import time
 from array import array
 
@@ -16,7 +17,7 @@ class Duplis:
         self.count += 1
 
 
-def convert(blender_obj, scene, context, luxcore_scene, engine=None):
+def convert(blender_obj, scene, context, luxcore_scene, temp_meshes, engine=None):
     assert blender_obj.is_duplicator
 
     dupli_props = pyluxcore.Properties()
@@ -53,7 +54,8 @@ def convert(blender_obj, scene, context, luxcore_scene, engine=None):
                 name_suffix += utils.get_luxcore_name(dupli.particle_system, context)
 
             obj_props, exported_obj = blender_object.convert(dupli.object, scene, context, luxcore_scene,
-                                                             update_mesh=True, dupli_suffix=name_suffix)
+                                                             update_mesh=True, dupli_suffix=name_suffix,
+                                                             temp_meshes=temp_meshes)
             dupli_props.Set(obj_props)
             exported_duplis[name] = Duplis(exported_obj, matrix_list)
 
@@ -69,7 +71,7 @@ def convert(blender_obj, scene, context, luxcore_scene, engine=None):
 
     blender_obj.dupli_list_clear()
     # Need to parse so we have the dupli objects available for DuplicateObject
-    luxcore_scene.Parse(dupli_props)
+    ImageExporter.parse(luxcore_scene, dupli_props)
 
     for duplis in exported_duplis.values():
         # exported_obj sometimes is None, e.g. when instancing a group using an empty
@@ -1,59 +1,497 @@
 import bpy
 import tempfile
 import os
+import hashlib
+import re
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from .. import utils
 
+# Properties that reference image files or in-memory image maps
+IMAGE_PROPERTY_SUFFIXES = (".file", ".mapfile")
+
+
+class ImageExportSettings(object):
+    """
+    Settings of one export, owned by the Exporter and activated with ImageExporter.use_settings().
+    Final renders export on their own thread, so they can't be stored in the ImageExporter.
+    """
+    def __init__(self, write_files=False, proxy_size=0, prefetch_frames=0):
+        # Packed and generated images are handed to LuxCore from memory, unless the scene is written
+        # to disk (filesaver engine), in this case they have to be saved as files.
+        self.write_files = write_files
+        # Maximum width/height of image files in viewport renders (0: use the originals)
+        self.proxy_size = proxy_size
+        # How many upcoming frames of image sequences are prefetched (only in animation renders)
+        self.prefetch_frames = prefetch_frames
+
 
 class ImageExporter(object):
     """
     This class is a singleton
     """
-    temp_images = {}
+    # {content_hash: filepath} of images unpacked to disk, the least recently used comes first
+    temp_images = OrderedDict()
+    # {content_hash: number of renders using the file}, files in use are never deleted
+    temp_image_refs = {}
+    # Content hashes of the temp images used by the running render
+    current_temp_images = set()
+    # Unused temp images are deleted when they take up more disk space than this
+    MAX_TEMP_DISK_USAGE = 4 * 1024 ** 3  # bytes
+    # {name: (image, gamma)} of the exported in-memory images. The names are derived from the content,
+    # so the entries can be shared by all sessions. Each scene defines the images its props reference
+    # in parse(). The pixels are only read at that point and released right afterwards.
+    in_memory_images = {}
+    # {key: (update_state, hash)}, to avoid hashing the same pixels again
+    image_hashes = {}
+    # The settings of the export running on the current thread, see use_settings()
+    _local = threading.local()
+
+    @classmethod
+    @contextmanager
+    def use_settings(cls, settings):
+        """ Use around an export, the settings only apply to the current thread """
+        previous = getattr(cls._local, "settings", None)
+        cls._local.settings = settings
+        try:
+            yield
+        finally:
+            cls._local.settings = previous
+
+    @classmethod
+    def get_settings(cls):
+        settings = getattr(cls._local, "settings", None)
+        return settings if settings is not None else ImageExportSettings()
 
     @classmethod
     def _save_to_temp_file(cls, image, scene):
-        key = utils.make_key(image)
+        content_hash = cls._get_content_hash(image)
+        filepath = cls.temp_images.get(content_hash)
 
-        if key in cls.temp_images:
-            # Image was already exported
-            temp_image = cls.temp_images[key]
+        if filepath and os.path.isfile(filepath):
+            # An image with the same content was already unpacked
+            cls.temp_images.move_to_end(content_hash)
         else:
             _, extension = os.path.splitext(image.filepath_raw)
-            temp_image = tempfile.NamedTemporaryFile(delete=False, suffix=extension)
-            cls.temp_images[key] = temp_image
+            with tempfile.NamedTemporaryFile(delete=False, suffix=extension) as temp_image:
+                filepath = temp_image.name
 
-            print('Unpacking image "%s" to temp file "%s"' % (image.name, temp_image.name))
+            print('Unpacking image "%s" to temp file "%s"' % (image.name, filepath))
             orig_filepath = image.filepath_raw
-            image.filepath_raw = temp_image.name
+            image.filepath_raw = filepath
             image.save()
             image.filepath_raw = orig_filepath
+            cls.temp_images[content_hash] = filepath
+
+        if content_hash not in cls.current_temp_images:
+            cls.current_temp_images.add(content_hash)
+            cls.temp_image_refs[content_hash] = cls.temp_image_refs.get(content_hash, 0) + 1
 
-        return temp_image.name
+        cls._enforce_temp_disk_usage()
+        return filepath
 
     @classmethod
-    def export(cls, image, scene=None):
-        if image.source == "GENERATED":
-            return cls._save_to_temp_file(image, scene)
-        elif image.source == "FILE":
-            if image.packed_file:
+    def _get_content_hash(cls, image):
+        """ Returns the hash of the pixels, the pixels themselves are not kept """
+        key = utils.make_key(image)
+        state = get_image_update_state(image)
+
+        if key in cls.image_hashes and not image.is_dirty:
+            cached_state, content_hash = cls.image_hashes[key]
+
+            if cached_state == state:
+                return content_hash
+
+        content_hash = hashlib.sha1(read_pixels(image).data).hexdigest()
+        cls.image_hashes[key] = (state, content_hash)
+        return content_hash
+
+    @classmethod
+    def _export_from_memory(cls, image, gamma):
+        """
+        Returns the name of an in-memory image map with the pixels of the image.
+        Images with identical content share the same name (and memory in LuxCore).
+        """
+        name = "blendluxcore_image_%s_%g" % (cls._get_content_hash(image), gamma)
+        cls.in_memory_images[name] = (image, gamma)
+        return name
+
+    @classmethod
+    def define_images(cls, luxcore_scene, props):
+        """ Define the in-memory images referenced by props, call this before parsing them """
+        for prop_name in props.GetAllNames():
+            if not prop_name.endswith(IMAGE_PROPERTY_SUFFIXES):
+                continue
+
+            name = props.Get(prop_name).GetString()
+            if name in cls.in_memory_images and not luxcore_scene.IsImageMapDefined(name):
+                image, gamma = cls.in_memory_images[name]
+                _define_image(luxcore_scene, name, image, gamma)
+
+    @classmethod
+    def parse(cls, luxcore_scene, props):
+        """ Use instead of luxcore_scene.Parse(), so the in-memory images used by props are defined """
+        cls.define_images(luxcore_scene, props)
+        luxcore_scene.Parse(props)
+
+    @classmethod
+    def export(cls, image, scene=None, gamma=2.2, image_user=None):
+        """
+        Returns the filepath or in-memory image map name that LuxCore can use to load the image.
+        :param gamma: Gamma of in-memory images, should match the gamma of the texture or light using it
+        :param image_user: Object with frame_start, frame_offset, frame_duration and use_cyclic attributes
+                           (like Blender's ImageUser), used to find the frame of image sequences.
+                           If None, the current frame is used directly.
+        """
+        settings = cls.get_settings()
+
+        if image.source == "GENERATED" or (image.source == "FILE" and image.packed_file):
+            if settings.write_files:
                 return cls._save_to_temp_file(image, scene)
+            return cls._export_from_memory(image, gamma)
+        elif image.source == "FILE":
+            filepath = utils.get_abspath(image.filepath, library=image.library, must_exist=True, must_be_file=True)
+            if filepath:
+                if settings.proxy_size:
+                    return TextureProxyCache.get(image, filepath, settings.proxy_size)
+                return filepath
             else:
-                filepath = utils.get_abspath(image.filepath, library=image.library, must_exist=True, must_be_file=True)
-                if filepath:
-                    return filepath
-                else:
-                    raise OSError('Could not find image "%s" at path "%s"' % (image.name, image.filepath))
+                raise OSError('Could not find image "%s" at path "%s"' % (image.name, image.filepath))
         elif image.source == "SEQUENCE":
-            # TODO
-            raise NotImplementedError("Sequence not supported yet")
+            return cls._export_sequence(image, scene or bpy.context.scene, image_user, settings)
         else:
             raise Exception('Unsupported image source "%s" in image "%s"' % (image.source, image.name))
 
+    @classmethod
+    def _export_sequence(cls, image, scene, image_user, settings):
+        frame = get_sequence_frame(scene.frame_current, image_user)
+        filepath = utils.get_abspath(get_sequence_filepath(image, frame), library=image.library,
+                                     must_exist=True, must_be_file=True)
+        if not filepath:
+            raise OSError('Could not find frame %d of image sequence "%s"' % (frame, image.name))
+
+        if settings.prefetch_frames:
+            upcoming = []
+            for i in range(1, settings.prefetch_frames + 1):
+                next_frame = get_sequence_frame(scene.frame_current + i * scene.frame_step, image_user)
+                next_path = utils.get_abspath(get_sequence_filepath(image, next_frame), library=image.library)
+                if next_path != filepath:
+                    upcoming.append(next_path)
+            ImageSequencePrefetcher.prefetch(upcoming)
+
+        if settings.proxy_size:
+            return TextureProxyCache.get(image, filepath, settings.proxy_size)
+        return filepath
+
+    @classmethod
+    def release_temp_images(cls):
+        """ Call when a render is finished, the temp images it used may be deleted afterwards """
+        for content_hash in cls.current_temp_images:
+            cls.temp_image_refs[content_hash] -= 1
+            if cls.temp_image_refs[content_hash] <= 0:
+                del cls.temp_image_refs[content_hash]
+
+        cls.current_temp_images = set()
+        cls._enforce_temp_disk_usage()
+
+    @classmethod
+    def clear_image_hashes(cls):
+        cls.image_hashes = {}
+
+    @classmethod
+    def clear_in_memory_images(cls):
+        """ Call after undo/redo, the images referenced by the entries are invalid """
+        cls.in_memory_images = {}
+
+    @classmethod
+    def delete_unused_temp_images(cls):
+        """ Call when a new file is loaded, its images have nothing in common with the old ones """
+        for content_hash in list(cls.temp_images.keys()):
+            if content_hash not in cls.temp_image_refs:
+                cls._delete_temp_image(content_hash)
+
+        cls.in_memory_images = {}
+        cls.image_hashes = {}
+
+    @classmethod
+    def _enforce_temp_disk_usage(cls):
+        sizes = {}
+        for content_hash, filepath in cls.temp_images.items():
+            try:
+                sizes[content_hash] = os.path.getsize(filepath)
+            except OSError:
+                sizes[content_hash] = 0
+        total_size = sum(sizes.values())
+
+        # Least recently used first
+        for content_hash in list(cls.temp_images.keys()):
+            if total_size <= cls.MAX_TEMP_DISK_USAGE:
+                break
+            if content_hash not in cls.temp_image_refs:
+                cls._delete_temp_image(content_hash)
+                total_size -= sizes[content_hash]
+
+    @classmethod
+    def _delete_temp_image(cls, content_hash):
+        filepath = cls.temp_images.pop(content_hash)
+        print("Deleting temporary image:", filepath)
+        try:
+            os.remove(filepath)
+        except OSError:
+            # Already deleted by someone else, e.g. the system tmp cleaner
+            pass
+
     @classmethod
     def cleanup(cls):
-        for temp_image in cls.temp_images.values():
-            print("Deleting temporary image:", temp_image.name)
-            os.remove(temp_image.name)
+        for content_hash in list(cls.temp_images.keys()):
+            cls._delete_temp_image(content_hash)
+
+        cls.temp_image_refs = {}
+        cls.current_temp_images = set()
+        cls.in_memory_images = {}
+        cls.image_hashes = {}
+
+
+def _define_image(luxcore_scene, name, image, gamma):
+    """ Only one copy of the pixels exists at a time, LuxCore copies them into its own image map """
+    width, height = image.size
+    channels = image.channels
+    pixels = read_pixels(image)
+
+    # Blender stores the bottom row first, LuxCore expects the top row first.
+    # The rows are swapped in place to avoid a flipped copy of the whole image.
+    rows = pixels.reshape((height, width * channels))
+    for y in range(height // 2):
+        row = rows[y].copy()
+        rows[y] = rows[height - 1 - y]
+        rows[height - 1 - y] = row
+
+    luxcore_scene.DefineImageMap(name, pixels, gamma, channels, width, height)
+
+
+def get_sequence_frame(frame_current, image_user=None):
+    """ Returns the frame number of the image sequence file to use (same as Blender's ImageUser) """
+    if image_user is None:
+        return frame_current
+
+    duration = image_user.frame_duration
+    frame = frame_current - image_user.frame_start + 1
+
+    if image_user.use_cyclic:
+        frame %= duration
+        if frame == 0:
+            frame = duration
+
+    frame = min(max(frame, 0), duration)
+    return frame + image_user.frame_offset
+
+
+def get_sequence_filepath(image, frame):
+    """ Replace the frame number in the (not absolute) filepath of an image sequence """
+    head, tail = os.path.split(image.filepath)
+    name, extension = os.path.splitext(tail)
+    match = re.search(r"\d+$", name)
+
+    if match is None:
+        raise OSError('Image sequence "%s" has no frame number in its filepath' % image.name)
+
+    # Keep the zero padding of the original
+    digits = len(match.group())
+    return os.path.join(head, name[:match.start()] + str(frame).zfill(digits) + extension)
+
+
+class ImageSequencePrefetcher(object):
+    """
+    This class is a singleton.
+    Reads the files of the upcoming frames of image sequences in a background thread,
+    so they are already in the file system cache when LuxCore loads them for the next
+    frame of an animation render.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    requested = set()
+
+    @classmethod
+    def prefetch(cls, filepaths):
+        for filepath in filepaths:
+            if filepath not in cls.requested:
+                cls.requested.add(filepath)
+                cls.executor.submit(cls._read, filepath)
+
+    @classmethod
+    def clear(cls):
+        cls.requested = set()
+
+    @staticmethod
+    def _read(filepath):
+        try:
+            with open(filepath, "rb") as file:
+                while file.read(4 * 1024 ** 2):
+                    pass
+        except OSError:
+            # Missing frames are reported when they are exported
+            pass
+
+
+class TextureProxyCache(object):
+    """
+    This class is a singleton.
+    Creates downscaled copies of image files for viewport renders and keeps them in a
+    cache directory on disk. Proxies are keyed by path, modification time, file size and
+    maximum size, so they are created again if the original file changes. If the cache
+    directory grows larger than MAX_DISK_USAGE, the least recently used proxies are deleted.
+    """
+    directory = os.path.join(tempfile.gettempdir(), "blendluxcore_proxies")
+    MAX_DISK_USAGE = 2 * 1024 ** 3  # bytes
+    # Keys of the files that are small enough to be used without proxy
+    small_files = set()
+
+    @classmethod
+    def get(cls, image, filepath, max_size):
+        """ Returns the filepath of the proxy, or the original filepath if no proxy is needed """
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return filepath
+
+        key = "%s|%f|%d|%d" % (filepath, stat.st_mtime, stat.st_size, max_size)
+        if key in cls.small_files:
+            return filepath
+
+        _, extension = os.path.splitext(filepath)
+        proxy_path = os.path.join(cls.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + extension)
+
+        if os.path.isfile(proxy_path):
+            # Mark as recently used
+            os.utime(proxy_path)
+            return proxy_path
+
+        # Reading the size makes Blender load the full image, so it is only done if there is no proxy yet
+        width, height = image.size
+        if max(width, height) <= max_size:
+            cls.small_files.add(key)
+            return filepath
+
+        try:
+            cls._create_proxy(filepath, proxy_path, width, height, max_size)
+        except (OSError, RuntimeError) as error:
+            print('Could not create proxy of image "%s": %s' % (image.name, error))
+            if os.path.isfile(proxy_path):
+                os.remove(proxy_path)
+            return filepath
+
+        cls._evict()
+        return proxy_path
+
+    @classmethod
+    def _create_proxy(cls, filepath, proxy_path, width, height, max_size):
+        os.makedirs(cls.directory, exist_ok=True)
+        scale = max_size / max(width, height)
+        proxy_width = max(1, round(width * scale))
+        proxy_height = max(1, round(height * scale))
+        print('Creating %dx%d proxy of image "%s"' % (proxy_width, proxy_height, filepath))
+
+        # Load a separate copy, the original image in Blender has to stay untouched
+        proxy = bpy.data.images.load(filepath, check_existing=False)
+        try:
+            proxy.scale(proxy_width, proxy_height)
+            # Saved in the file format of the original
+            proxy.filepath_raw = proxy_path
+            proxy.save()
+        finally:
+            bpy.data.images.remove(proxy)
+
+    @classmethod
+    def _evict(cls):
+        entries = []
+        for name in os.listdir(cls.directory):
+            path = os.path.join(cls.directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        # Oldest first
+        for _, size, path in sorted(entries):
+            if total_size <= cls.MAX_DISK_USAGE:
+                break
+            print("Deleting unused texture proxy:", path)
+            os.remove(path)
+            total_size -= size
+
+
+class ImagePixelCache(object):
+    """
+    This class is a singleton.
+    It holds the pixels of images as compact float arrays, so they
+    only have to be copied out of Blender once per image version
+    (e.g. for hair color lookups from the emitter texture).
+    """
+    # {key: (update_state, pixels)}
+    cache = {}
+
+    @classmethod
+    def get(cls, image):
+        """ Returns the pixels of the image as flat float32 array """
+        key = utils.make_key(image)
+        state = get_image_update_state(image)
+
+        if key in cls.cache and not image.is_dirty:
+            cached_state, pixels = cls.cache[key]
+
+            if cached_state == state:
+                return pixels
+
+        print('Reading pixels of image "%s"' % image.name)
+        pixels = read_pixels(image)
+        cls.cache[key] = (state, pixels)
+        return pixels
+
+    @classmethod
+    def update(cls):
+        """
+        Called from the scene_update_post handler, where is_updated is valid.
+        Discards the pixels of images that were changed (e.g. reloaded or painted).
+        """
+        if not cls.cache or not bpy.data.images.is_updated:
+            return
+
+        for image in bpy.data.images:
+            if image.is_updated:
+                cls.cache.pop(utils.make_key(image), None)
+
+    @classmethod
+    def clear(cls):
+        cls.cache = {}
+
+
+def get_image_update_state(image):
+    """ Changes when the pixels of the image might have changed (except for painting, see Image.is_dirty) """
+    if image.packed_file:
+        source_state = image.packed_file.size
+    elif image.source == "GENERATED":
+        source_state = (image.generated_type, tuple(image.generated_color), image.use_generated_float)
+    else:
+        # Changes when the image is saved after painting or the file is replaced on disk
+        filepath = utils.get_abspath(image.filepath_raw, library=image.library)
+        try:
+            source_state = os.stat(filepath).st_mtime
+        except OSError:
+            source_state = None
+
+    return (image.name, image.source, image.filepath_raw, tuple(image.size),
+            image.channels, image.packed_file is not None, source_state)
+
+
+def read_pixels(image):
+    """ Copy the pixels of an image into a flat float32 array """
+    pixels = np.empty(len(image.pixels), dtype=np.float32)
 
-        cls.temp_images = {}
+    try:
+        # Bulk copy without creating Python floats (not available in all Blender versions)
+        image.pixels.foreach_get(pixels)
+    except AttributeError:
+        pixels[:] = image.pixels[:]
 
+    return pixels
@@ -0,0 +1,124 @@
+import math
+from .. import utils
+
+# Lamps with a very small estimated contribution still get this importance,
+# otherwise they would (almost) never be sampled
+MIN_IMPORTANCE = 0.01
+# Prevents extreme values for lamps right next to the camera (in Blender units)
+DISTANCE_SOFTENING = 1
+# Above this ratio between the brightest and the dimmest lamp, LOG_POWER is used
+POWER_RANGE_THRESHOLD = 100
+
+
+class LightImportanceEstimator(object):
+    """
+    This class is a singleton.
+    Estimates how much each lamp contributes to the image (from its power, efficacy,
+    emitting area and distance to the camera). The results can be used as light
+    importance, so bright lamps near the camera are sampled more often than dim or
+    distant ones, and to pick a light strategy.
+    Sun and hemi lamps are not estimated, they light the whole scene.
+    """
+    # {lamp object key: importance}
+    importances = {}
+    # Estimated luminous flux of all lamps
+    fluxes = []
+
+    @classmethod
+    def update(cls, scene, context=None):
+        """ Call before the lamps are exported """
+        cls.importances = {}
+        cls.fluxes = []
+
+        config = scene.luxcore.config
+        if not config.use_auto_light_importance and config.light_strategy != "AUTO":
+            return
+
+        camera_pos = _get_camera_position(scene, context)
+        objs = context.visible_objects if context else scene.objects
+        scores = {}
+
+        for obj in objs:
+            if obj.type != "LAMP" or obj.data.type in {"SUN", "HEMI"}:
+                continue
+            if not utils.is_obj_visible(obj, scene, context):
+                continue
+
+            flux = _estimate_flux(obj)
+            cls.fluxes.append(flux)
+
+            if camera_pos is None:
+                distance_sq = 0
+            else:
+                distance_sq = (obj.matrix_world.translation - camera_pos).length_squared
+            scores[utils.make_key(obj)] = flux / (distance_sq + DISTANCE_SOFTENING ** 2)
+
+        if config.use_auto_light_importance:
+            max_score = max(scores.values(), default=0)
+            if max_score > 0:
+                cls.importances = {key: max(score / max_score, MIN_IMPORTANCE) for key, score in scores.items()}
+                cls._print_summary(objs)
+
+    @classmethod
+    def get(cls, obj):
+        """ Returns the estimated importance of the lamp object, or None if it was not estimated """
+        return cls.importances.get(utils.make_key(obj))
+
+    @classmethod
+    def get_light_strategy(cls):
+        if cls.importances:
+            # The estimated importance already includes the power of the lamps
+            return "UNIFORM"
+
+        positive_fluxes = [flux for flux in cls.fluxes if flux > 0]
+        if len(positive_fluxes) > 1 and max(positive_fluxes) / min(positive_fluxes) > POWER_RANGE_THRESHOLD:
+            # Power would concentrate almost all samples on a few very bright lamps
+            return "LOG_POWER"
+        return "POWER"
+
+    @classmethod
+    def _print_summary(cls, objs):
+        estimated = [(cls.importances[utils.make_key(obj)], obj.name) for obj in objs
+                     if utils.make_key(obj) in cls.importances]
+        estimated.sort(reverse=True)
+
+        print("Estimated light importance (%d lamps):" % len(estimated))
+        for importance, name in estimated[:10]:
+            print("    %.4f  %s" % (importance, name))
+        if len(estimated) > 10:
+            print("    ...")
+
+
+def _get_camera_position(scene, context):
+    if context:
+        region_data = getattr(context, "region_data", None)
+        if region_data:
+            return region_data.view_matrix.inverted().translation
+        return None
+
+    if scene.camera:
+        return scene.camera.matrix_world.translation
+    return None
+
+
+def _estimate_flux(obj):
+    lamp = obj.data
+    settings = lamp.luxcore
+    r, g, b = settings.rgb_gain
+    flux = settings.gain * (0.2126 * r + 0.7152 * g + 0.0722 * b)
+
+    if lamp.type in {"POINT", "SPOT", "AREA"} and settings.power > 0 and settings.efficacy > 0:
+        # LuxCore normalizes these lamps to the given power
+        return flux * settings.power * settings.efficacy
+
+    if lamp.type == "POINT":
+        flux *= 4 * math.pi
+    elif lamp.type == "SPOT":
+        # Solid angle of the cone
+        flux *= 2 * math.pi * (1 - math.cos(lamp.spot_size / 2))
+    elif lamp.type == "AREA":
+        size_y = lamp.size_y if lamp.shape == "RECTANGLE" else lamp.size
+        scale = obj.matrix_world.to_scale()
+        flux *= lamp.size * size_y * abs(scale.x * scale.y)
+
+    return flux
@@ -5,9 +5,12 @@ from ..bin import pyluxcore
 from .. import utils
 from ..utils import ExportedObject, ExportedLight
 from .image import ImageExporter
+from .importance import LightImportanceEstimator
 
 
 WORLD_BACKGROUND_LIGHT_NAME = "__WORLD_BACKGROUND_LIGHT__"
+# Unit quad shared by all area lamps, their size is part of the object transformation
+AREA_LAMP_SHAPE_NAME = "Mesh-__AREA_LAMP_QUAD__"
 MISSING_IMAGE_COLOR = [1, 0, 1]
 
 
@@ -30,6 +33,7 @@ def convert_lamp(blender_obj, scene, context, luxcore_scene):
         # Common light settings shared by all light types
         # Note: these variables are also passed to the area light export function
         gain, samples, importance = _convert_common_props(lamp)
+        importance = _get_importance(blender_obj, importance)
         definitions["gain"] = gain
         definitions["samples"] = samples
         definitions["importance"] = importance
@@ -42,7 +46,7 @@ def convert_lamp(blender_obj, scene, context, luxcore_scene):
 
                 if lamp.luxcore.image:
                     try:
-                        filepath = ImageExporter.export(lamp.luxcore.image)
+                        filepath = ImageExporter.export(lamp.luxcore.image, scene, lamp.luxcore.gamma)
                         definitions["mapfile"] = filepath
                         definitions["gamma"] = lamp.luxcore.gamma
                     except OSError as error:
@@ -96,7 +100,7 @@ def convert_lamp(blender_obj, scene, context, luxcore_scene):
             if lamp.luxcore.image:
                 # projection
                 try:
-                    definitions["mapfile"] = ImageExporter.export(lamp.luxcore.image)
+                    definitions["mapfile"] = ImageExporter.export(lamp.luxcore.image, scene, lamp.luxcore.gamma)
                     definitions["type"] = "projection"
                     definitions["fov"] = coneangle * 2
                     definitions["gamma"] = lamp.luxcore.gamma
@@ -119,9 +123,7 @@ def convert_lamp(blender_obj, scene, context, luxcore_scene):
             definitions["position"] = [0, 0, 0]
             definitions["target"] = [0, 0, -1]
 
-            spot_fix = Matrix.Rotation(math.radians(-90.0), 4, "Z")
-            transformation = utils.matrix_to_list(matrix * spot_fix, scene, apply_worldscale=True)
-            definitions["transformation"] = transformation
+            definitions["transformation"] = _calc_spot_transformation(matrix, scene)
 
         elif lamp.type == "HEMI":
             if lamp.luxcore.image:
@@ -142,9 +144,7 @@ def convert_lamp(blender_obj, scene, context, luxcore_scene):
                 definitions["position"] = [0, 0, 0]
                 definitions["target"] = [0, 0, -1]
 
-                spot_fix = Matrix.Rotation(math.radians(-90.0), 4, "Z")
-                transformation = utils.matrix_to_list(matrix * spot_fix, scene, apply_worldscale=True)
-                definitions["transformation"] = transformation
+                definitions["transformation"] = _calc_spot_transformation(matrix, scene)
             else:
                 # area (mesh light)
                 return _convert_area_lamp(blender_obj, scene, context, luxcore_scene, gain, samples, importance)
@@ -166,6 +166,114 @@ def convert_lamp(blender_obj, scene, context, luxcore_scene):
         return pyluxcore.Properties(), None
 
 
+def convert_lamp_transform(blender_obj, scene, context):
+    """
+    Returns the properties of the lamp that depend on its transformation,
+    or None if the lamp can not be updated this way
+    """
+    lamp = blender_obj.data
+    luxcore_name = utils.get_luxcore_name(blender_obj, context)
+    prefix = "scene.lights." + luxcore_name + "."
+    matrix = blender_obj.matrix_world
+    definitions = {}
+
+    if lamp.type == "POINT":
+        definitions["transformation"] = utils.matrix_to_list(matrix, scene, apply_worldscale=True)
+    elif lamp.type == "SUN":
+        sun_dir = _calc_sun_dir(blender_obj)
+        if lamp.luxcore.sun_type == "sun":
+            definitions["dir"] = sun_dir
+        else:
+            definitions["direction"] = [-sun_dir[0], -sun_dir[1], -sun_dir[2]]
+    elif lamp.type == "SPOT" or (lamp.type == "AREA" and lamp.luxcore.is_laser):
+        definitions["transformation"] = _calc_spot_transformation(matrix, scene)
+    elif lamp.type == "AREA":
+        # Area lamps are mesh objects
+        transform_matrix = calc_area_lamp_transformation(blender_obj)
+        if transform_matrix.determinant() == 0:
+            return None
+        prefix = "scene.objects." + luxcore_name + "."
+        definitions["transformation"] = utils.matrix_to_list(transform_matrix, scene, apply_worldscale=True)
+    elif lamp.type == "HEMI" and lamp.luxcore.image:
+        definitions["transformation"] = _calc_infinite_transformation(matrix, scene)
+
+    return utils.create_props(prefix, definitions)
+
+
+def convert_lamp_gain(blender_obj, scene, context):
+    """ Returns the properties of the lamp that only influence its brightness """
+    lamp = blender_obj.data
+    luxcore_name = utils.get_luxcore_name(blender_obj, context)
+    gain, samples, importance = _convert_common_props(lamp)
+    importance = _get_importance(blender_obj, importance)
+
+    if lamp.type == "AREA" and not lamp.luxcore.is_laser:
+        prefix = "scene.materials." + _get_area_lamp_mat_name(luxcore_name) + "."
+        definitions = {
+            "emission.gain": gain,
+            "emission.power": lamp.luxcore.power,
+            "emission.efficency": lamp.luxcore.efficacy,
+            "emission.samples": samples,
+            "importance": importance,
+        }
+    else:
+        prefix = "scene.lights." + luxcore_name + "."
+        definitions = {
+            "gain": gain,
+            "samples": samples,
+            "importance": importance,
+        }
+        if lamp.type in {"POINT", "SPOT", "AREA"}:
+            definitions["efficency"] = lamp.luxcore.efficacy
+            definitions["power"] = lamp.luxcore.power
+
+    return utils.create_props(prefix, definitions)
+
+
+# The property that references the image of a lamp, if its type supports one
+IMAGE_PROPERTIES = {"POINT": "mapfile", "SPOT": "mapfile", "HEMI": "file"}
+
+
+def is_missing_image_fallback(blender_obj, props, context):
+    """
+    Returns True if the image of the lamp could not be exported, so the lamp
+    was converted with the fallback type and MISSING_IMAGE_COLOR gain.
+    """
+    lamp = blender_obj.data
+    if not lamp.luxcore.image or lamp.type not in IMAGE_PROPERTIES:
+        return False
+
+    luxcore_name = utils.get_luxcore_name(blender_obj, context)
+    return not props.IsDefined("scene.lights." + luxcore_name + "." + IMAGE_PROPERTIES[lamp.type])
+
+
+# Lamp settings that only influence the brightness, see get_lamp_structure()
+GAIN_SETTINGS = {"gain", "rgb_gain", "samples", "importance", "power", "efficacy"}
+# Blender lamp settings that we use (not all exist on all lamp types)
+LAMP_SETTINGS = ("type", "shape", "size", "size_y", "spot_size", "spot_blend")
+
+
+def get_lamp_structure(lamp):
+    """
+    Returns a snapshot of all lamp settings except the ones in GAIN_SETTINGS.
+    If it did not change, an edited lamp can be updated with convert_lamp_gain().
+    """
+    structure = [getattr(lamp, name, None) for name in LAMP_SETTINGS]
+
+    for prop in lamp.luxcore.bl_rna.properties:
+        name = prop.identifier
+        if name == "rna_type" or name in GAIN_SETTINGS:
+            continue
+
+        value = getattr(lamp.luxcore, name)
+        if hasattr(value, "__len__") and not isinstance(value, (str, bpy.types.ID)):
+            # Vector properties, compare their values
+            value = tuple(value)
+        structure.append(value)
+
+    return structure
+
+
 def convert_world(world, scene):
     try:
         assert isinstance(world, bpy.types.World)
@@ -230,11 +338,17 @@ def _convert_common_props(lamp_or_world):
     return gain, samples, importance
 
 
+def _get_importance(blender_obj, importance):
+    """ Returns the automatically estimated importance of the lamp if available """
+    estimated = LightImportanceEstimator.get(blender_obj)
+    return importance if estimated is None else estimated
+
+
 def _convert_infinite(definitions, lamp_or_world, scene, transformation=None):
     assert lamp_or_world.luxcore.image is not None
 
     try:
-        filepath = ImageExporter.export(lamp_or_world.luxcore.image)
+        filepath = ImageExporter.export(lamp_or_world.luxcore.image, scene, lamp_or_world.luxcore.gamma)
     except OSError as error:
         type = "Lamp" if isinstance(lamp_or_world, bpy.types.Lamp) else "World"
         msg = '%s "%s": %s' % (type, lamp_or_world.name, error)
@@ -251,10 +365,18 @@ def _convert_infinite(definitions, lamp_or_world, scene, transformation=None):
     definitions["sampleupperhemisphereonly"] = lamp_or_world.luxcore.sampleupperhemisphereonly
 
     if transformation:
-        infinite_fix = Matrix.Scale(1.0, 4)
-        infinite_fix[0][0] = -1.0  # mirror the hdri map to match Cycles and old LuxBlend
-        transformation = utils.matrix_to_list(infinite_fix * transformation.inverted(), scene)
-        definitions["transformation"] = transformation
+        definitions["transformation"] = _calc_infinite_transformation(transformation, scene)
+
+
+def _calc_infinite_transformation(transformation, scene):
+    infinite_fix = Matrix.Scale(1.0, 4)
+    infinite_fix[0][0] = -1.0  # mirror the hdri map to match Cycles and old LuxBlend
+    return utils.matrix_to_list(infinite_fix * transformation.inverted(), scene)
+
+
+def _calc_spot_transformation(matrix, scene):
+    spot_fix = Matrix.Rotation(math.radians(-90.0), 4, "Z")
+    return utils.matrix_to_list(matrix * spot_fix, scene, apply_worldscale=True)
 
 
 def calc_area_lamp_transformation(blender_obj):
@@ -283,7 +405,7 @@ def _convert_area_lamp(blender_obj, scene, context, luxcore_scene, gain, samples
     props = pyluxcore.Properties()
 
     # Light emitting material
-    mat_name = luxcore_name + "_AREA_LIGHT_MAT"
+    mat_name = _get_area_lamp_mat_name(luxcore_name)
     mat_prefix = "scene.materials." + mat_name + "."
     mat_definitions = {
         "type": "matte",
@@ -327,21 +449,10 @@ def _convert_area_lamp(blender_obj, scene, context, luxcore_scene, gain, samples
         raise Exception("Area lamp has size 0 (can not be exported)")
 
     transform = utils.matrix_to_list(transform_matrix, scene, apply_worldscale=True)
-    # Only bake the transform into the mesh for final renders (disables instancing which
-    # is needed for viewport render so we can move the light object)
-
-    # Instancing just means that we transform the object instead of the mesh
-    if utils.use_instancing(blender_obj, scene, context):
-        obj_transform = transform
-        mesh_transform = None
-    else:
-        obj_transform = None
-        mesh_transform = transform
-
-    # shape_transform = None if context else transform
 
-    shape_name = "Mesh-" + luxcore_name
-    if not luxcore_scene.IsMeshDefined(shape_name):
+    # All area lamps are instances of the same quad (also in final renders), this
+    # saves a lot of memory and parsing time in scenes with many area lamps
+    if not luxcore_scene.IsMeshDefined(AREA_LAMP_SHAPE_NAME):
         vertices = [
             (1, 1, 0),
             (1, -1, 0),
@@ -352,16 +463,14 @@ def _convert_area_lamp(blender_obj, scene, context, luxcore_scene, gain, samples
             (0, 1, 2),
             (2, 3, 0)
         ]
-        luxcore_scene.DefineMesh(shape_name, vertices, faces, None, None, None, None, mesh_transform)
+        luxcore_scene.DefineMesh(AREA_LAMP_SHAPE_NAME, vertices, faces, None, None, None, None, None)
 
     obj_prefix = "scene.objects." + luxcore_name + "."
     obj_definitions = {
         "material": mat_name,
-        "shape": shape_name,
+        "shape": AREA_LAMP_SHAPE_NAME,
+        "transformation": transform,
     }
-    if obj_transform:
-        # Use instancing for viewport render so we can interactively move the light
-        obj_definitions["transformation"] = obj_transform
 
     obj_props = utils.create_props(obj_prefix, obj_definitions)
     props.Set(obj_props)
@@ -372,6 +481,10 @@ def _convert_area_lamp(blender_obj, scene, context, luxcore_scene, gain, samples
     return props, exported_obj
 
 
+def _get_area_lamp_mat_name(luxcore_name):
+    return luxcore_name + "_AREA_LIGHT_MAT"
+
+
 def _indirect_light_visibility(definitions, lamp_or_world):
     definitions.update({
         "visibility.indirect.diffuse.enable": lamp_or_world.luxcore.visibility_indirect_diffuse,
@@ -396,7 +509,7 @@ def export_ies(definitions, iesfile_type, iesfile_text, iesfile_path, flipz, lib
             text = iesfile_text
 
             if text:
-                blob = text.as_string().encode("ascii")
+                blob = IESCache.get_blob(text)
 
                 if blob:
                     definitions[prefix + "iesblob"] = [blob]
@@ -405,10 +518,45 @@ def export_ies(definitions, iesfile_type, iesfile_text, iesfile_path, flipz, lib
             iesfile = iesfile_path
 
             if iesfile:
-                filepath = utils.get_abspath(iesfile, library, must_exist=True, must_be_file=True)
+                filepath = IESCache.get_filepath(iesfile, library)
 
                 if filepath:
                     definitions[prefix + "iesfile"] = filepath
                 else:
                     error = 'Could not find .ies file at path "%s"' % iesfile
                     raise OSError(error)
+
+
+class IESCache(object):
+    """
+    This class is a singleton.
+    Remembers the IES data during one export, so lamps and mesh lights sharing an
+    IES profile don't encode the same text or look up the same file again.
+    Reset at the start of each export, so edited texts and moved files are picked up.
+    """
+    # {text key: blob}
+    texts = {}
+    # {(iesfile, library key): filepath or None}
+    paths = {}
+
+    @classmethod
+    def get_blob(cls, text):
+        key = utils.make_key(text)
+
+        if key not in cls.texts:
+            cls.texts[key] = text.as_string().encode("ascii")
+        return cls.texts[key]
+
+    @classmethod
+    def get_filepath(cls, iesfile, library):
+        """ Returns the absolute filepath, or None if the file does not exist """
+        key = (iesfile, utils.make_key(library) if library else None)
+
+        if key not in cls.paths:
+            cls.paths[key] = utils.get_abspath(iesfile, library, must_exist=True, must_be_file=True)
+        return cls.paths[key]
+
+    @classmethod
+    def reset(cls):
+        cls.texts = {}
+        cls.paths = {}
@@ -1,6 +1,7 @@
 from ..bin import pyluxcore
 from .. import utils
 from ..nodes.output import get_active_output
+from ..utils.node import NodeExportProfiler
 
 
 GLOBAL_FALLBACK_MAT = "__CLAY__"
@@ -29,7 +30,8 @@ def convert(material, scene, context):
             return fallback(luxcore_name)
 
         # Now export the material node tree, starting at the output node
-        active_output.export(props, luxcore_name)
+        with NodeExportProfiler.measure_node_tree(material.name):
+            NodeExportProfiler.export_node(active_output, props, luxcore_name)
 
         return luxcore_name, props
     except Exception as error:
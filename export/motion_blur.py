@@ -1,6 +1,7 @@
 import math
 from ..bin import pyluxcore
 from .. import utils
+from .light import calc_area_lamp_transformation
 
 
 def convert(context, scene, objects, exported_objects):
@@ -12,7 +13,9 @@ def convert(context, scene, objects, exported_objects):
     assert steps >= 2 and isinstance(steps, int)
 
     frame_offsets = _calc_frame_offsets(motion_blur.shutter, steps)
-    matrices = _get_matrices(context, scene, steps, frame_offsets, objects, exported_objects)
+    # Only objects that can move have to be sampled, this saves a lot of time in scenes with many static objects
+    moving_objects = [obj for obj in objects if not _is_static(obj)] if objects else None
+    matrices = _get_matrices(context, scene, steps, frame_offsets, moving_objects, exported_objects)
 
     # Find and delete entries of non-moving objects (where all matrices are equal)
     for prefix, matrix_steps in list(matrices.items()):
@@ -41,6 +44,83 @@ def convert(context, scene, objects, exported_objects):
     return props, is_camera_moving
 
 
+def _is_static(obj):
+    """
+    Find out if an object can not move during the shutter interval.
+    This is a conservative check, static objects are never classified as moving.
+    """
+    if _is_animated(obj):
+        return False
+
+    # Constraints can make the object follow other (possibly animated) objects
+    if obj.constraints:
+        return False
+
+    # Simulated by the rigid body world
+    if obj.rigid_body:
+        return False
+
+    if obj.parent:
+        if obj.parent_type in {"VERTEX", "VERTEX_3"}:
+            # The parent mesh could be deformed by modifiers or shape keys
+            return False
+        if obj.parent.data and _is_animated(obj.parent.data):
+            # E.g. a curve with "Path Animation", its eval_time is animated on the curve data
+            return False
+        return _is_static(obj.parent)
+
+    return True
+
+
+def _is_animated(datablock):
+    anim_data = datablock.animation_data
+    return bool(anim_data and (anim_data.action or anim_data.drivers or anim_data.nla_tracks))
+
+
+class TransformCache(object):
+    """
+    This class is a singleton.
+    Stores the matrices sampled during a final render, keyed by the exact (sub)frame time.
+    In animation renders, the shutter interval of a frame can overlap with the one of the
+    previous frame, so these samples do not have to be evaluated again.
+    Cleared when a render job starts, finishes or is cancelled.
+    """
+    # {time: {sample_key: matrix}}
+    samples = {}
+
+    @classmethod
+    def get(cls, time, sample_keys):
+        """ Returns the samples at this time, or None if not all sample_keys are cached """
+        try:
+            cached = cls.samples[_time_key(time)]
+        except KeyError:
+            return None
+
+        if all(key in cached for key in sample_keys):
+            return cached
+        return None
+
+    @classmethod
+    def add(cls, time, samples):
+        cls.samples.setdefault(_time_key(time), {}).update(samples)
+
+    @classmethod
+    def evict_before(cls, time):
+        """ Delete all samples that lie behind time (they are not needed by later frames) """
+        limit = _time_key(time)
+        for key in [key for key in cls.samples if key < limit]:
+            del cls.samples[key]
+
+    @classmethod
+    def clear(cls):
+        cls.samples.clear()
+
+
+def _time_key(time):
+    # Frame offsets are calculated with floats, round to avoid precision issues
+    return round(time, 6)
+
+
 def _calc_frame_offsets(shutter, steps):
     """ Return a list of offsets (unit: frame) to step through in _get_matrices() """
     step_interval = shutter / (steps - 1)
@@ -54,47 +134,99 @@ def _get_matrices(context, scene, steps, frame_offsets, objects=None, exported_o
     frame_center = scene.frame_current
     subframe_center = scene.frame_subframe
 
+    if motion_blur.object_blur and objects and exported_objects:
+        targets = _get_object_prefixes(objects, exported_objects)
+    else:
+        targets = []
+
+    use_camera_blur = motion_blur.camera_blur and not context
+    camera_key = "scene.camera." + utils.make_key(scene.camera)
+    sample_keys = [prefix for _, prefixes in targets for prefix in prefixes]
+    if use_camera_blur:
+        sample_keys.append(camera_key)
+
+    # The scene does not change between the frames of a final render, so the
+    # samples of the previous frame's shutter interval can be reused
+    use_cache = not context
+    if use_cache:
+        TransformCache.evict_before(frame_center + subframe_center + frame_offsets[0])
+    frame_changed = False
+
     for step in range(steps):
         offset = frame_offsets[step]
         frame = frame_center + subframe_center + offset
+
+        cached = TransformCache.get(frame, sample_keys) if use_cache else None
+        if cached is not None:
+            for prefix in sample_keys:
+                matrix = cached[prefix]
+                if prefix == camera_key:
+                    prefix = "scene.camera."
+                _append_matrix(matrices, prefix, matrix, step)
+            continue
+
         frame_int = math.floor(frame)
         subframe = frame - frame_int
         scene.frame_set(frame_int, subframe)
+        frame_changed = True
 
-        if motion_blur.object_blur and objects and exported_objects:
-            _append_object_matrices(objects, exported_objects, matrices, step)
+        if targets:
+            _append_object_matrices(targets, matrices, step)
 
-        if motion_blur.camera_blur and not context:
+        if use_camera_blur:
             matrix = scene.camera.matrix_world
 
             prefix = "scene.camera."
             _append_matrix(matrices, prefix, matrix, step)
 
-    # Restore original frame
-    scene.frame_set(frame_center, subframe_center)
+        if use_cache:
+            samples = {prefix: matrices[prefix][step] for _, prefixes in targets for prefix in prefixes}
+            if use_camera_blur:
+                samples[camera_key] = matrices["scene.camera."][step]
+            TransformCache.add(frame, samples)
+
+    if frame_changed:
+        # Restore original frame
+        scene.frame_set(frame_center, subframe_center)
     return matrices
 
 
-def _append_object_matrices(objects, exported_objects, matrices, step):
+def _get_object_prefixes(objects, exported_objects):
+    """ Returns a list of (object, [prefix1, prefix2, ...]) tuples """
+    targets = []
+
     for obj in objects:
         key = utils.make_key(obj)
 
         try:
             exported_thing = exported_objects[key]
-
-            for luxcore_name in exported_thing.luxcore_names:
-                # exported_objects contains instances of ExportedObject and ExportedLight
-                if isinstance(exported_thing, utils.ExportedObject):
-                    prefix = "scene.objects." + luxcore_name + "."
-                else:
-                    prefix = "scene.lights." + luxcore_name + "."
-
-                matrix = obj.matrix_world
-                _append_matrix(matrices, prefix, matrix, step)
         except KeyError:
             # This is not a problem, objects are skipped during epxort for various reasons
             # E.g. if the object is not visible, or if it's a camera
-            pass
+            continue
+
+        # exported_objects contains instances of ExportedObject and ExportedLight
+        if isinstance(exported_thing, utils.ExportedObject):
+            prefix = "scene.objects."
+        else:
+            prefix = "scene.lights."
+
+        prefixes = [prefix + luxcore_name + "." for luxcore_name in exported_thing.luxcore_names]
+        targets.append((obj, prefixes))
+
+    return targets
+
+
+def _append_object_matrices(targets, matrices, step):
+    for obj, prefixes in targets:
+        if obj.type == "LAMP" and obj.data.type == "AREA" and not obj.data.luxcore.is_laser:
+            # Area lamps are instances of a unit quad, the lamp size is part of their transformation
+            matrix = calc_area_lamp_transformation(obj)
+        else:
+            matrix = obj.matrix_world
+
+        for prefix in prefixes:
+            _append_matrix(matrices, prefix, matrix, step)
 
 
 def _append_matrix(matrices, prefix, matrix, step):
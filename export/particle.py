@@ -1,10 +1,17 @@
 from ..bin import pyluxcore
 from . import material
+from .image import ImageExporter, ImagePixelCache
 from .. import utils
 from time import time
+from itertools import chain
 import math
+import numpy as np
 
-def convert_hair(blender_obj, psys, luxcore_scene, scene, context=None, engine=None):
+# Number of strands per chunk when large hair systems are split in final render
+HAIR_CHUNK_SIZE = 50000
+
+
+def convert_hair(blender_obj, psys, luxcore_scene, scene, temp_meshes, context=None, engine=None):
     try:
         assert psys.settings.render_type == "PATH"
 
@@ -56,22 +63,14 @@ def convert_hair(blender_obj, psys, luxcore_scene, scene, context=None, engine=N
                 0.3 * psys.settings.virtual_parents * psys.settings.child_nbr * num_parents)
             start = num_parents + num_virtual_parents
 
-        segments = []
-        points = []
-        thickness = []
-        colors = []
-        uv_coords = []
-        total_segments_count = 0
+        dupli_count = num_parents + num_children
         uv_tex = None
+        image = None
         colorflag = False
         uvflag = False
-        thicknessflag = 0
-        image_width = 0
-        image_height = 0
-        image_pixels = []
 
-        modifier_mode = "PREVIEW" if context else "RENDER"
-        mesh = blender_obj.to_mesh(scene, True, modifier_mode)
+        # The emitter mesh is shared with the object export and removed by temp_meshes
+        mesh = temp_meshes.get(blender_obj)
         uv_textures = mesh.tessface_uv_textures
         vertex_color = mesh.tessface_vertex_colors
 
@@ -85,123 +84,117 @@ def convert_hair(blender_obj, psys, luxcore_scene, scene, context=None, engine=N
             if has_uv_texture:
                 uv_tex = uv_textures.active.data
                 if uv_tex[0].image:
-                    image_width = uv_tex[0].image.size[0]
-                    image_height = uv_tex[0].image.size[1]
-                    image_pixels = uv_tex[0].image.pixels[:]
+                    image = uv_tex[0].image
                     colorflag = True
                 uvflag = True
 
-        transform = blender_obj.matrix_world.inverted()
-        total_strand_count = 0
-
-        if root_width == tip_width:
-            thicknessflag = 0
-            hair_size *= root_width
-        else:
-            thicknessflag = 1
-
-        dupli_count = num_parents + num_children
-        i = 0
-
-        for pindex in range(start, dupli_count):
-            if num_children == 0:
-                i = pindex
-
-            # Make it possible to interrupt the export process
-            if engine and pindex % 1000 == 0:
-                progress = (pindex / dupli_count) * 100
-                engine.update_stats("Export", "Object: %s (Hair Particles: %d%%)" % (blender_obj.name, progress))
-
-                if engine.test_break():
-                    return
-
-            # A small optimization in order to speedup the export
-            # process: cache the uv_co and color value
-            uv_co = None
-            col = None
-            seg_length = 1.0
-            point_count = 0
-
-            for step in range(0, steps+1):
-                co = psys.co_hair(blender_obj, pindex, step)
-                if step > 0 and points:
-                    seg_length = (co - blender_obj.matrix_world * points[-1]).length_squared
-
-                if not (co.length_squared == 0 or seg_length == 0):
-                    points.append(transform * co)
-
-                    if thicknessflag:
-                        if step > steps * width_offset:
-                            thick = (root_width * (steps - step - 1) + tip_width * (
-                                        step - steps * width_offset)) / (
-                                        steps * (1 - width_offset) - 1)
-                        else:
-                            thick = root_width
-
-                        thickness.append(thick * hair_size)
-
-                    point_count += 1
-
-                    if settings.export_color == 'uv_texture_map' and not len(image_pixels) == 0:
-                        if uvflag:
-                            if not uv_co:
-                                uv_co = psys.uv_on_emitter(mod, psys.particles[i], pindex, uv_textures.active_index)
-
-                            uv_coords.append(uv_co)
-                        if not col:
-                            x_co = round(uv_co[0] * (image_width - 1))
-                            y_co = round(uv_co[1] * (image_height - 1))
+        # Shape: (strand count, steps + 1, 3), in world space
+        points = _collect_points(blender_obj, psys, start, dupli_count, steps, engine)
+        if points is None:
+            # Export cancelled by the user
+            if not context:
+                psys.set_resolution(scene, blender_obj, "PREVIEW")
+            return
 
-                            pixelnumber = (image_width * y_co) + x_co
+        # Filter out invalid points (located at the origin) and points that
+        # coincide with the last kept point (they would create zero-length segments)
+        valid = _get_valid_points(points)
+        # Strands with less than two points do not have a single segment
+        valid[valid.sum(axis=1) < 2] = False
+        strand_mask = valid.any(axis=1)
+        point_counts = valid.sum(axis=1)[strand_mask]
+        total_strand_count = len(point_counts)
+
+        if total_strand_count == 0:
+            print("[%s: %s] No valid hair strands" % (blender_obj.name, psys.name))
+            if not context:
+                psys.set_resolution(scene, blender_obj, "PREVIEW")
+            return
 
-                            r = image_pixels[pixelnumber * 4]
-                            g = image_pixels[pixelnumber * 4 + 1]
-                            b = image_pixels[pixelnumber * 4 + 2]
-                            col = (r, g, b)
+        # The hair shape is defined in object space
+        transform = np.array(blender_obj.matrix_world.inverted(), dtype=np.float64)
+        points = points[valid].dot(transform[:3, :3].T) + transform[:3, 3]
 
-                        colors.append(col)
-                    elif settings.export_color == "vertex_color" and has_vertex_colors:
-                        if not col:
-                            col = psys.mcol_on_emitter(mod, psys.particles[i], pindex, vertex_color.active_index)
+        if root_width == tip_width:
+            thickness = hair_size * root_width
+        else:
+            profile = _calc_thickness_profile(steps, root_width, tip_width, width_offset) * hair_size
+            thickness = np.broadcast_to(profile, valid.shape)[valid]
 
-                        colors.append(col)
+        # Indices of the particles that are exported as strands
+        pindices = np.arange(start, dupli_count)[strand_mask]
+        # Colors and UVs are constant along a strand, so they are
+        # looked up once per strand and then repeated for every point
+        uvs = None
+        colors = None
 
-            if point_count == 1:
-                points.pop()
+        if uvflag:
+            uvs = _get_strand_uvs(psys, mod, pindices, num_children, uv_textures.active_index)
 
-                if thicknessflag:
-                    thickness.pop()
-                point_count -= 1
-            elif point_count > 1:
-                segments.append(point_count - 1)
-                total_strand_count += 1
-                total_segments_count = total_segments_count + point_count - 1
+            if image:
+                image_pixels = ImagePixelCache.get(image)
+                width, height = image.size
+                colors = _sample_image(image_pixels, width, height, image.channels, uvs)
 
-        # LuxCore needs tuples, not vectors
-        points_as_tuples = [tuple(point) for point in points]
+            uvs = np.repeat(uvs, point_counts, axis=0)
+        elif colorflag:
+            colors = _get_strand_vertex_colors(psys, mod, pindices, num_children, vertex_color.active_index)
 
-        if not thicknessflag:
-            thickness = hair_size
+        if colors is not None:
+            colors = np.repeat(colors, point_counts, axis=0)
 
-        if not colorflag:
-            colors = (1.0, 1.0, 1.0)
+        luxcore_shape_name = utils.get_luxcore_name(blender_obj, context) + "_" + utils.get_luxcore_name(psys)
+        # Documentation: http://www.luxrender.net/forum/viewtopic.php?f=8&t=12116&sid=03a16c5c345db3ee0f8126f28f1063c8#p112819
 
-        if not uvflag:
-            uvs_as_tuples = None
+        # In final render, very large systems are split into chunks that are defined as separate
+        # shapes, so we can report progress and check for cancellation between the chunks
+        if context or total_strand_count <= HAIR_CHUNK_SIZE:
+            chunks = [(0, total_strand_count)]
         else:
-            # LuxCore needs tuples, not vectors
-            uvs_as_tuples = [tuple(uv) for uv in uv_coords]
+            chunks = [(first, min(first + HAIR_CHUNK_SIZE, total_strand_count))
+                      for first in range(0, total_strand_count, HAIR_CHUNK_SIZE)]
+
+        # Index of the first point of each strand
+        point_offsets = np.concatenate(([0], np.cumsum(point_counts)))
+
+        def prepare_chunk(chunk):
+            first, last = chunk
+            point_slice = slice(point_offsets[first], point_offsets[last])
+            chunk_thickness = thickness[point_slice] if isinstance(thickness, np.ndarray) else thickness
+            chunk_colors = None if colors is None else colors[point_slice]
+            chunk_uvs = None if uvs is None else uvs[point_slice]
+            return _prepare_strand_buffers(points[point_slice], point_counts[first:last],
+                                           chunk_thickness, chunk_colors, chunk_uvs)
+
+        shape_names = []
+
+        for chunk_index, chunk in enumerate(chunks):
+            if engine:
+                if len(chunks) > 1:
+                    message = "Refining Hair System %s (Chunk %d/%d)" % (psys.name, chunk_index + 1, len(chunks))
+                else:
+                    message = "Refining Hair System %s" % psys.name
+                engine.update_stats("Exporting...", message)
 
-        luxcore_shape_name = utils.get_luxcore_name(blender_obj, context) + "_" + utils.get_luxcore_name(psys)
+                if engine.test_break():
+                    if not context:
+                        psys.set_resolution(scene, blender_obj, "PREVIEW")
+                    return
 
-        if engine:
-            engine.update_stats('Exporting...', 'Refining Hair System %s' % psys.name)
-        # Documentation: http://www.luxrender.net/forum/viewtopic.php?f=8&t=12116&sid=03a16c5c345db3ee0f8126f28f1063c8#p112819
+            if len(chunks) > 1:
+                shape_name = "%s_chunk%d" % (luxcore_shape_name, chunk_index)
+            else:
+                shape_name = luxcore_shape_name
+
+            strand_count = chunk[1] - chunk[0]
+            points_as_tuples, segments, chunk_thickness, chunk_colors, chunk_uvs = prepare_chunk(chunk)
 
-        luxcore_scene.DefineStrands(luxcore_shape_name, total_strand_count, len(points), points_as_tuples, segments,
-                                    thickness, 0.0, colors, uvs_as_tuples,
-                                    settings.tesseltype, settings.adaptive_maxdepth, settings.adaptive_error,
-                                    settings.solid_sidecount, settings.solid_capbottom, settings.solid_captop, True)
+            luxcore_scene.DefineStrands(shape_name, strand_count, len(points_as_tuples), points_as_tuples,
+                                        segments, chunk_thickness, 0.0, chunk_colors, chunk_uvs,
+                                        settings.tesseltype, settings.adaptive_maxdepth, settings.adaptive_error,
+                                        settings.solid_sidecount, settings.solid_capbottom, settings.solid_captop,
+                                        True)
+            shape_names.append(shape_name)
 
         # For some reason this index is not starting at 0 but at 1 (Blender is strange)
         material_index = psys.settings.material - 1
@@ -222,13 +215,15 @@ def convert_hair(blender_obj, psys, luxcore_scene, scene, context=None, engine=N
         # move it to the correct position
         transform = utils.matrix_to_list(blender_obj.matrix_world, scene, apply_worldscale=True)
 
-        prefix = 'scene.objects.' + luxcore_shape_name
+        # Each chunk is its own LuxCore object with the material and transformation of the hair system
+        for shape_name in shape_names:
+            prefix = 'scene.objects.' + shape_name
 
-        strandsProps.Set(pyluxcore.Property(prefix + '.material', lux_mat_name))
-        strandsProps.Set(pyluxcore.Property(prefix + '.shape', luxcore_shape_name))
-        strandsProps.Set(pyluxcore.Property(prefix + '.transformation', transform))
+            strandsProps.Set(pyluxcore.Property(prefix + '.material', lux_mat_name))
+            strandsProps.Set(pyluxcore.Property(prefix + '.shape', shape_name))
+            strandsProps.Set(pyluxcore.Property(prefix + '.transformation', transform))
 
-        luxcore_scene.Parse(strandsProps)
+        ImageExporter.parse(luxcore_scene, strandsProps)
 
         if not context:
             # Resolution was changed to 'RENDER' for final renders, change it back
@@ -241,3 +236,127 @@ def convert_hair(blender_obj, psys, luxcore_scene, scene, context=None, engine=N
         scene.luxcore.errorlog.add_warning(msg)
         import traceback
         traceback.print_exc()
+
+
+def _get_valid_points(points):
+    """ Returns a (strand count, steps + 1) mask of the points that are exported """
+    valid = np.any(points != 0, axis=2)
+    # The last kept point of each strand, points are only compared within their strand
+    last_points = points[:, 0].copy()
+    has_last = valid[:, 0].copy()
+
+    for step in range(1, points.shape[1]):
+        step_points = points[:, step]
+        valid[:, step] &= ~has_last | np.any(step_points != last_points, axis=1)
+
+        kept = valid[:, step]
+        last_points[kept] = step_points[kept]
+        has_last |= kept
+
+    return valid
+
+
+def _collect_points(blender_obj, psys, start, dupli_count, steps, engine=None):
+    """
+    Collect the hair key coordinates of all strands into one array of
+    shape (strand count, steps + 1, 3), in world space.
+    Returns None if the export was cancelled by the user.
+    """
+    co_hair = psys.co_hair
+    step_range = range(steps + 1)
+    strand_count = dupli_count - start
+    points = np.empty((strand_count, steps + 1, 3), dtype=np.float64)
+    # Fill the array in blocks so we can report progress and check for cancellation
+    block_size = 1000
+
+    for block_start in range(start, dupli_count, block_size):
+        block_end = min(block_start + block_size, dupli_count)
+
+        if engine:
+            progress = ((block_start - start) / strand_count) * 100
+            engine.update_stats("Export", "Object: %s (Hair Particles: %d%%)" % (blender_obj.name, progress))
+
+            if engine.test_break():
+                return None
+
+        coords = chain.from_iterable(co_hair(blender_obj, pindex, step)
+                                     for pindex in range(block_start, block_end)
+                                     for step in step_range)
+        count = (block_end - block_start) * (steps + 1) * 3
+        block = np.fromiter(coords, dtype=np.float64, count=count)
+        points[block_start - start:block_end - start] = block.reshape(-1, steps + 1, 3)
+
+    return points
+
+
+def _calc_thickness_profile(steps, root_width, tip_width, width_offset):
+    """ Returns the relative thickness for each step along a strand """
+    step = np.arange(steps + 1, dtype=np.float64)
+    tip_part = ((root_width * (steps - step - 1) + tip_width * (step - steps * width_offset))
+                / (steps * (1 - width_offset) - 1))
+    return np.where(step > steps * width_offset, tip_part, root_width)
+
+
+def _get_particle(psys, pindex, num_children):
+    # Children use the first parent (this mirrors what Blender's exporters do)
+    return psys.particles[pindex if num_children == 0 else 0]
+
+
+def _get_strand_uvs(psys, mod, pindices, num_children, uv_index):
+    uvs = np.empty((len(pindices), 2), dtype=np.float64)
+
+    for i, pindex in enumerate(pindices.tolist()):
+        particle = _get_particle(psys, pindex, num_children)
+        uvs[i] = psys.uv_on_emitter(mod, particle, pindex, uv_index)
+
+    return uvs
+
+
+def _get_strand_vertex_colors(psys, mod, pindices, num_children, vcol_index):
+    colors = np.empty((len(pindices), 3), dtype=np.float64)
+
+    for i, pindex in enumerate(pindices.tolist()):
+        particle = _get_particle(psys, pindex, num_children)
+        colors[i] = psys.mcol_on_emitter(mod, particle, pindex, vcol_index)
+
+    return colors
+
+
+def _sample_image(pixels, width, height, channels, uvs):
+    """
+    Nearest neighbour lookup of the RGB values at the given UV coordinates.
+    pixels: flat array as found in image.pixels
+    """
+    x = np.clip(np.rint(uvs[:, 0] * (width - 1)), 0, width - 1).astype(np.int64)
+    y = np.clip(np.rint(uvs[:, 1] * (height - 1)), 0, height - 1).astype(np.int64)
+    pixel_indices = (width * y + x) * channels
+
+    if channels < 3:
+        # Greyscale image
+        return np.repeat(pixels[pixel_indices][:, np.newaxis], 3, axis=1)
+
+    return np.stack([pixels[pixel_indices + channel] for channel in range(3)], axis=1)
+
+
+def _prepare_strand_buffers(points, point_counts, thickness, colors, uvs):
+    """ Convert the arrays into the types expected by DefineStrands() """
+    # LuxCore needs lists of tuples, not arrays
+    points_as_tuples = _to_tuples(points)
+    segments = (point_counts - 1).tolist()
+
+    if isinstance(thickness, np.ndarray):
+        thickness = thickness.tolist()
+
+    if colors is None:
+        colors = (1.0, 1.0, 1.0)
+    else:
+        colors = _to_tuples(colors)
+
+    if uvs is not None:
+        uvs = _to_tuples(uvs)
+
+    return points_as_tuples, segments, thickness, colors, uvs
+
+
+def _to_tuples(array):
+    return list(map(tuple, array.tolist()))
@@ -1,6 +1,13 @@
 import bpy
+import numpy as np
+from ..bin import pyluxcore
 from .. import utils
 from time import time
+import math
+
+# Number of slices a smoke grid is read in with Blender 2.79
+GRID_SLICE_COUNT = 8
+
 
 def convert(smoke_obj, channel):
     print("[%s] Beginning smoke export (channel: %s)" % (smoke_obj.name, channel))
@@ -33,7 +40,7 @@ def convert(smoke_obj, channel):
         msg = 'Object "%s": No smoke data (simulate some frames first)' % smoke_obj.name
         raise Exception(msg)
 
-    channeldata = list(grid)
+    channeldata = _read_grid(grid)
     big_res = list(settings.domain_resolution)
 
     if settings.use_high_resolution:
@@ -41,6 +48,86 @@ def convert(smoke_obj, channel):
             big_res[i] *= settings.amplify + 1
 
     elapsed_time = time() - start_time
-    print("[%s] Smoke export of channel %s took %.3fs" % (smoke_obj.name, channel, elapsed_time))
+    print("[%s] Smoke export of channel %s took %.3fs (%.1f MB)"
+          % (smoke_obj.name, channel, elapsed_time, channeldata.nbytes / 1024 ** 2))
 
     return big_res[0], big_res[1], big_res[2], channeldata
+
+
+def get_voxel_size(smoke_obj):
+    """ Returns the edge lengths of one voxel as list [x, y, z], or None if smoke_obj is not a smoke domain """
+    smoke_domain_mod = utils.find_smoke_domain_modifier(smoke_obj)
+    if smoke_domain_mod is None:
+        return None
+
+    settings = smoke_domain_mod.domain_settings
+    big_res = list(settings.domain_resolution)
+
+    if settings.use_high_resolution:
+        for i in range(3):
+            big_res[i] *= settings.amplify + 1
+
+    if 0 in big_res:
+        return None
+    return [smoke_obj.dimensions[i] / big_res[i] for i in range(3)]
+
+
+def crop_grid(nx, ny, nz, grid, threshold=0):
+    """
+    Crop a grid to the bounding box of the voxels with absolute values above threshold
+    (e.g. the heat grid can contain negative values).
+    Returns the new resolution, the cropped grid and the offset (in voxels) of the
+    bounding box within the original grid.
+    """
+    # Blender stores the grid with x varying fastest
+    voxels = grid.reshape((nz, ny, nx))
+    occupied = np.abs(voxels) > threshold
+
+    if not occupied.any():
+        # Completely empty, a single voxel is enough
+        return 1, 1, 1, np.zeros(1, dtype=grid.dtype), (0, 0, 0)
+
+    bounds = []
+    for axis in range(3):
+        # Collapse the other two axes
+        other_axes = tuple(a for a in range(3) if a != axis)
+        indices = np.nonzero(occupied.any(axis=other_axes))[0]
+        # Convert from numpy integers, pyluxcore only accepts Python ints
+        bounds.append((int(indices[0]), int(indices[-1]) + 1))
+
+    (z0, z1), (y0, y1), (x0, x1) = bounds
+    cropped = np.ascontiguousarray(voxels[z0:z1, y0:y1, x0:x1]).ravel()
+    return x1 - x0, y1 - y0, z1 - z0, cropped, (x0, y0, z0)
+
+
+def create_grid_property(name, grid):
+    """ Create a pyluxcore.Property from a grid without building a list of Python floats """
+    prop = pyluxcore.Property(name)
+    try:
+        # Copies directly from the buffer of the numpy array
+        prop.AddAllFloat(grid)
+    except AttributeError:
+        # Not available in older pyluxcore versions
+        prop = pyluxcore.Property(name, grid.tolist())
+    return prop
+
+
+def _read_grid(grid):
+    """ Copy a smoke grid into a flat float32 array """
+    channeldata = np.empty(len(grid), dtype=np.float32)
+
+    if hasattr(grid, "foreach_get"):
+        # Bulk copy without creating Python floats (Blender 2.83 and newer)
+        grid.foreach_get(channeldata)
+        return channeldata
+
+    # Blender 2.79 can only convert the grid to Python floats. Reading it in slices limits
+    # the number of Python floats alive at the same time to a fraction of the grid.
+    # Every slice makes Blender copy the complete grid in C, so the number of slices is fixed.
+    slice_size = max(1, math.ceil(len(channeldata) / GRID_SLICE_COUNT))
+
+    for start in range(0, len(channeldata), slice_size):
+        end = min(start + slice_size, len(channeldata))
+        channeldata[start:end] = grid[start:end]
+
+    return channeldata
@@ -1,6 +1,7 @@
 from ..bin import pyluxcore
 from .. import utils
 from ..nodes.output import get_active_output
+from ..utils.node import NodeExportProfiler
 from . import light
 
 # TODO: currently it is not possible to remove the world volume during viewport render
@@ -25,7 +26,8 @@ def convert(scene):
         luxcore_name = utils.get_luxcore_name(volume_node_tree)
         active_output = get_active_output(volume_node_tree)
         try:
-            active_output.export(props, luxcore_name)
+            with NodeExportProfiler.measure_node_tree(volume_node_tree.name):
+                NodeExportProfiler.export_node(active_output, props, luxcore_name)
             props.Set(pyluxcore.Property("scene.world.volume.default", luxcore_name))
         except Exception as error:
             msg = 'World "%s": %s' % (world.name, error)
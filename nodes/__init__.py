@@ -62,6 +62,7 @@ class LuxCoreNode(Node):
 
         prefix = self.prefix + luxcore_name + "."
         props.Set(utils.create_props(prefix, definitions))
+        utils_node.NodeExportProfiler.add_props(self, len(definitions))
         return luxcore_name
 
 
@@ -95,6 +96,14 @@ class LuxCoreNodeTexture(LuxCoreNode):
     """Base class for texture nodes"""
     suffix = "tex"
     prefix = "scene.textures."
+    # Textures with data that is not part of the definitions (e.g. smoke grids) can't be shared
+    deduplicate = True
+
+    def base_export(self, props, definitions, luxcore_name=None):
+        if luxcore_name is None and self.deduplicate and utils_node.TextureDeduplication.is_enabled():
+            # Identical textures (e.g. the same image in many materials) share one definition
+            luxcore_name = utils_node.TextureDeduplication.get_name(definitions)
+        return super().base_export(props, definitions, luxcore_name)
 
 
 class LuxCoreNodeVolume(LuxCoreNode):
@@ -236,7 +245,7 @@ class LuxCoreNodeTreePointer(LuxCoreNode):
         if luxcore_name is None:
             luxcore_name = self.make_name()
 
-        output.export(props, luxcore_name)
+        utils_node.NodeExportProfiler.export_node(output, props, luxcore_name)
         return luxcore_name
 
 
@@ -53,6 +53,7 @@ class LuxCoreMaterialNodeTree(NodeTree):
 
     # This block updates the preview, when socket links change
     def update(self):
+        utils_node.NodeTreeIndex.invalidate(self)
         self.refresh = True
 
         # Update opengl materials in case the node linked to the
@@ -99,7 +99,7 @@ class LuxCoreNodeMatOutput(LuxCoreNodeOutput):
         try:
             luxcore_name = utils.get_luxcore_name(node_tree)
             active_output = get_active_output(node_tree)
-            active_output.export(props, luxcore_name)
+            utils_node.NodeExportProfiler.export_node(active_output, props, luxcore_name)
             return luxcore_name
         except Exception as error:
             msg = 'Node Tree "%s": %s' % (node_tree.name, error)
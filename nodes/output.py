@@ -12,24 +12,13 @@ OUTPUT_MAP = {
 
 def get_active_output(node_tree):
     output_type = OUTPUT_MAP[node_tree.bl_idname]
-
-    for node in node_tree.nodes:
-        node_type = getattr(node, "bl_idname", None)
-
-        if node_type == output_type and node.active:
-            return node
+    return utils_node.NodeTreeIndex.get_active_output(node_tree, output_type)
 
 
 def get_output_nodes(node_tree):
     """ Return a list with all output nodes in a node tree """
     output_type = OUTPUT_MAP[node_tree.bl_idname]
-    nodes = []
-
-    for node in node_tree.nodes:
-        node_type = getattr(node, "bl_idname", None)
-        if node_type == output_type:
-            nodes.append(node)
-    return nodes
+    return utils_node.find_nodes(node_tree, output_type)
 
 
 def update_active(output_node, context):
@@ -83,6 +72,8 @@ class LuxCoreNodeOutput(LuxCoreNode):
 
     def set_active(self, active):
         self["active"] = active
+        if self.id_data:
+            utils_node.NodeTreeIndex.invalidate(self.id_data)
 
         # Update color
         theme = utils.get_theme(bpy.context)
@@ -1,7 +1,7 @@
 import mathutils
 from bpy.types import NodeSocket
 from bpy.props import EnumProperty, FloatProperty, FloatVectorProperty
-from ..utils.node import update_opengl_materials
+from ..utils.node import update_opengl_materials, NodeExportMemo, NodeExportProfiler
 
 # The rules for socket classes are these:
 # - If it is a socket that's used by more than one node, put it in this file
@@ -74,11 +74,17 @@ class LuxCoreNodeSocket(NodeSocket):
 
     def export(self, props, luxcore_name=None):
         if self.is_linked:
-            linked_node = self.links[0].from_node
+            link = self.links[0]
+            linked_node = link.from_node
             if luxcore_name:
-                return linked_node.export(props, luxcore_name)
+                return NodeExportProfiler.export_node(linked_node, props, luxcore_name)
             else:
-                return linked_node.export(props)
+                # The node might already be exported because it is linked to other sockets, too
+                exported_name = NodeExportMemo.get(props, link)
+                if exported_name is None:
+                    exported_name = NodeExportProfiler.export_node(linked_node, props)
+                    NodeExportMemo.add(props, link, exported_name)
+                return exported_name
         elif hasattr(self, "default_value"):
             return self.export_default()
         else:
@@ -3,6 +3,7 @@ from bpy.types import NodeTree
 import nodeitems_utils
 from nodeitems_utils import NodeCategory, NodeItem, NodeItemCustom
 from ...ui import ICON_TEXTURE
+from ...utils import node as utils_node
 
 # Import all texture nodes just so they get registered
 from .band import LuxCoreNodeTexBand
@@ -65,6 +66,7 @@ class LuxCoreTextureNodeTree(NodeTree):
 
     # This block updates the preview, when socket links change
     def update(self):
+        utils_node.NodeTreeIndex.invalidate(self)
         self.refresh = True
 
     def acknowledge_connection(self, context):
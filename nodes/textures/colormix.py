@@ -2,6 +2,7 @@ import bpy
 from bpy.props import BoolProperty, EnumProperty
 from .. import LuxCoreNodeTexture
 from ... import utils
+from ...utils import node as utils_node
 
 
 class LuxCoreNodeTexColorMix(LuxCoreNodeTexture):
@@ -61,6 +62,12 @@ class LuxCoreNodeTexColorMix(LuxCoreNodeTexture):
         layout.prop(self, "clamp_output")
 
     def export(self, props, luxcore_name=None):
+        if luxcore_name is None:
+            folded = self._fold(props)
+            if folded is not None:
+                utils_node.ConstantFolding.add()
+                return folded
+
         definitions = {
             "type": self.mode,
         }
@@ -96,3 +103,25 @@ class LuxCoreNodeTexColorMix(LuxCoreNodeTexture):
             return tex_name
         else:
             return luxcore_name
+
+    def _fold(self, props):
+        """ Returns the value or input that replaces this node, or None if it has to be exported """
+        if self.mode in {"abs", "clamp"}:
+            socket1 = self.inputs["Color"]
+        else:
+            socket1 = self.inputs["Color 1"]
+
+        if self.mode == "clamp":
+            clamp_range = (self.inputs["Min"].export(props), self.inputs["Max"].export(props))
+        else:
+            clamp_range = (0, 1)
+
+        result = utils_node.fold_operation(props, self.mode, socket1, self.inputs["Color 2"],
+                                           self.inputs["Fac"], clamp_range)
+
+        if result is not None and self.clamp_output and self.mode != "clamp":
+            if not utils_node.is_constant(result):
+                # The clamp texture is still needed
+                return None
+            result = utils_node.fold_constants(lambda value: min(max(value, 0), 1), result)
+        return result
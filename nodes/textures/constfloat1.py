@@ -1,5 +1,6 @@
 from bpy.props import FloatProperty
 from .. import LuxCoreNodeTexture
+from ...utils import node as utils_node
 
 
 class LuxCoreNodeTexConstfloat1(LuxCoreNodeTexture):
@@ -15,6 +16,11 @@ class LuxCoreNodeTexConstfloat1(LuxCoreNodeTexture):
         layout.prop(self, "value")
 
     def export(self, props, luxcore_name=None):
+        if luxcore_name is None:
+            # LuxCore accepts constant values wherever a texture is expected
+            utils_node.ConstantFolding.add()
+            return self.value
+
         definitions = {
             "type": "constfloat1",
             "value": self.value,
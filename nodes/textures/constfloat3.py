@@ -1,5 +1,6 @@
 from bpy.props import FloatVectorProperty, BoolProperty
 from .. import LuxCoreNodeTexture
+from ...utils import node as utils_node
 
 
 class LuxCoreNodeTexConstfloat3(LuxCoreNodeTexture):
@@ -24,6 +25,11 @@ class LuxCoreNodeTexConstfloat3(LuxCoreNodeTexture):
         layout.prop(self, "value")
 
     def export(self, props, luxcore_name=None):
+        if luxcore_name is None:
+            # LuxCore accepts constant values wherever a texture is expected
+            utils_node.ConstantFolding.add()
+            return list(self.value)
+
         definitions = {
             "type": "constfloat3",
             "value": list(self.value),
@@ -1,4 +1,6 @@
+import colorsys
 from .. import LuxCoreNodeTexture
+from ...utils import node as utils_node
 
 
 class LuxCoreNodeTexHSV(LuxCoreNodeTexture):
@@ -13,6 +15,12 @@ class LuxCoreNodeTexHSV(LuxCoreNodeTexture):
         self.outputs.new("LuxCoreSocketColor", "Color")
 
     def export(self, props, luxcore_name=None):
+        if luxcore_name is None:
+            folded = self._fold(props)
+            if folded is not None:
+                utils_node.ConstantFolding.add()
+                return folded
+
         definitions = {
             "type": "hsv",
             "texture": self.inputs["Color"].export(props),
@@ -21,3 +29,31 @@ class LuxCoreNodeTexHSV(LuxCoreNodeTexture):
             "value": self.inputs["Value"].export(props),
         }
         return self.base_export(props, definitions, luxcore_name)
+
+    def _fold(self, props):
+        """ Returns the value or input that replaces this node, or None if it has to be exported """
+        hue = self.inputs["Hue"].export(props)
+        saturation = self.inputs["Saturation"].export(props)
+        value = self.inputs["Value"].export(props)
+        if not all(isinstance(elem, (int, float)) for elem in (hue, saturation, value)):
+            return None
+
+        color = self.inputs["Color"].export(props)
+        if hue == 0.5 and saturation == 1 and value == 1:
+            # Hue 0.5 means no shift
+            return color
+        if not utils_node.is_constant(color):
+            return None
+
+        rgb = [color] * 3 if isinstance(color, (int, float)) else color
+        if min(rgb) < 0:
+            return None
+
+        # Same transformation as the hsv texture of LuxCore
+        h, s, v = colorsys.rgb_to_hsv(*rgb)
+        s *= saturation
+        if s > 1:
+            # Leave oversaturated colors to LuxCore
+            return None
+        h = (h + hue + 0.5) % 1
+        return [max(elem, 0) for elem in colorsys.hsv_to_rgb(h, s, v * value)]
@@ -1,5 +1,5 @@
 import bpy
-from bpy.props import PointerProperty, EnumProperty, BoolProperty, FloatProperty
+from bpy.props import PointerProperty, EnumProperty, BoolProperty, FloatProperty, IntProperty
 from .. import LuxCoreNodeTexture
 from ...export.image import ImageExporter
 from ...utils import node as utils_node
@@ -51,6 +51,16 @@ class LuxCoreNodeTexImagemap(LuxCoreNodeTexture):
     normal_map_scale = FloatProperty(name="Height", default=1, min=0, soft_max=5,
                                      description=NORMAL_SCALE_DESC)
 
+    # Image sequence settings, same meaning as in Blender's ImageUser
+    frame_duration = IntProperty(name="Frames", default=100, min=1,
+                                 description="Number of images of the sequence to use")
+    frame_start = IntProperty(name="Start Frame", default=1,
+                              description="Scene frame at which the sequence starts playing")
+    frame_offset = IntProperty(name="Offset", default=0,
+                               description="Offset the number of the frame to use in the sequence")
+    use_cyclic = BoolProperty(name="Cyclic", default=False,
+                              description="Cycle the images in the sequence")
+
     def init(self, context):
         self.add_input("LuxCoreSocketFloatPositive", "Gamma", 2.2)
         self.add_input("LuxCoreSocketFloatPositive", "Brightness", 1)
@@ -72,6 +82,14 @@ class LuxCoreNodeTexImagemap(LuxCoreNodeTexture):
         col = layout.column()
         col.active = self.image is not None
 
+        if self.image and self.image.source == "SEQUENCE":
+            box = col.box()
+            sub = box.column(align=True)
+            sub.prop(self, "frame_duration")
+            sub.prop(self, "frame_start")
+            sub.prop(self, "frame_offset")
+            box.prop(self, "use_cyclic")
+
         col.prop(self, "channel")
         col.prop(self, "wrap")
 
@@ -88,8 +106,12 @@ class LuxCoreNodeTexImagemap(LuxCoreNodeTexture):
         if self.image is None:
             return [0, 0, 0]
 
+        gamma = self.inputs["Gamma"].export(props)
+
         try:
-            filepath = ImageExporter.export(self.image)
+            # In-memory images need a number, the socket exports a texture name if it is linked
+            image_gamma = self.inputs["Gamma"].default_value
+            filepath = ImageExporter.export(self.image, gamma=image_gamma, image_user=self)
         except OSError as error:
             msg = 'Node "%s" in tree "%s": %s' % (self.name, self.id_data.name, error)
             bpy.context.scene.luxcore.errorlog.add_warning(msg)
@@ -108,7 +130,7 @@ class LuxCoreNodeTexImagemap(LuxCoreNodeTexture):
         definitions = {
             "type": "imagemap",
             "file": filepath,
-            "gamma": self.inputs["Gamma"].export(props),
+            "gamma": gamma,
             "gain": self.inputs["Brightness"].export(props),
             "channel": self.channel,
             "wrap": self.wrap,
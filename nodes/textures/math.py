@@ -1,6 +1,7 @@
 from bpy.props import EnumProperty, FloatProperty, BoolProperty
 from .. import LuxCoreNodeTexture
 from ... import utils
+from ...utils import node as utils_node
 
 MIX_DESCRIPTION = (
     "Mix between two values/textures according to the amount "
@@ -84,6 +85,12 @@ class LuxCoreNodeTexMath(LuxCoreNodeTexture):
             layout.prop(self, "mode_clamp_max")
 
     def export(self, props, luxcore_name=None):
+        if luxcore_name is None:
+            folded = self._fold(props)
+            if folded is not None:
+                utils_node.ConstantFolding.add()
+                return folded
+
         definitions = {
             "type": self.mode,
         }
@@ -120,3 +127,16 @@ class LuxCoreNodeTexMath(LuxCoreNodeTexture):
             return tex_name
         else:
             return luxcore_name
+
+    def _fold(self, props):
+        """ Returns the value or input that replaces this node, or None if it has to be exported """
+        clamp_range = (self.mode_clamp_min, self.mode_clamp_max)
+        result = utils_node.fold_operation(props, self.mode, self.inputs[0], self.inputs[1],
+                                           self.inputs[2], clamp_range)
+
+        if result is not None and self.clamp_output and self.mode != "clamp":
+            if not utils_node.is_constant(result):
+                # The clamp texture is still needed
+                return None
+            result = utils_node.fold_constants(lambda value: min(max(value, 0), 1), result)
+        return result
@@ -1,8 +1,8 @@
 import bpy
 import mathutils
 import math
-from bpy.props import EnumProperty, PointerProperty, StringProperty
-from ...export import smoke
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, PointerProperty, StringProperty
+from ...export import caches, smoke
 from ... import utils
 from .. import LuxCoreNodeTexture
 
@@ -10,6 +10,8 @@ from .. import LuxCoreNodeTexture
 class LuxCoreNodeTexSmoke(LuxCoreNodeTexture):
     bl_label = "Smoke"
     bl_width_min = 200
+    # The grid data is set after base_export(), two domains with equal resolution would be merged
+    deduplicate = False
     
     domain = PointerProperty(name="Domain", type=bpy.types.Object)
 
@@ -31,6 +33,19 @@ class LuxCoreNodeTexSmoke(LuxCoreNodeTexture):
     ]
     wrap = EnumProperty(name="Wrap", items=wrap_items, default="black")
 
+    use_crop = BoolProperty(name="Crop Empty Space", default=True,
+                            description="Only export the bounding box of the voxels above the threshold")
+    crop_threshold = FloatProperty(name="Threshold", default=0, min=0, soft_max=0.1, precision=4,
+                                   description="Voxels with values below or equal to this are treated as empty")
+
+    storage_items = [
+        ("float", "Float", "Full precision (4 bytes per voxel)", 0),
+        ("half", "Half", "Half precision (2 bytes per voxel)", 1),
+        ("byte", "Byte", "8 bit precision (1 byte per voxel), values are clamped to 0..1, "
+                         "only suitable for previews of density grids", 2),
+    ]
+    storage = EnumProperty(name="Storage", items=storage_items, default="float",
+                           description="Precision used by LuxCore to store the grid")
 
     def init(self, context):
         self.outputs.new("LuxCoreSocketFloatPositive", "Value")
@@ -47,6 +62,14 @@ class LuxCoreNodeTexSmoke(LuxCoreNodeTexture):
         col.prop(self, "source")
         col.prop(self, "wrap")
 
+        # With other wrap modes, the empty space around the cropped grid would not be black
+        if self.wrap == "black":
+            col = layout.column(align=True)
+            col.prop(self, "use_crop")
+            if self.use_crop:
+                col.prop(self, "crop_threshold")
+        layout.prop(self, "storage")
+
     def export(self, props, luxcore_name=None):
         if not self.domain:
             error = "No Domain object selected."
@@ -59,7 +82,23 @@ class LuxCoreNodeTexSmoke(LuxCoreNodeTexture):
             }
             return self.base_export(props, definitions, luxcore_name)
 
-        nx, ny, nz, grid = smoke.convert(self.domain, self.source)
+        nx, ny, nz, grid = caches.SmokeCache.convert(self.domain, self.source, bpy.context.scene)
+        full_size = grid.nbytes
+
+        if self.use_crop and self.wrap == "black":
+            full_res = nx, ny, nz
+            nx, ny, nz, grid, offset = smoke.crop_grid(nx, ny, nz, grid, self.crop_threshold)
+            # Map the unit cube of the texture to the cropped part of the domain
+            crop_loc = mathutils.Matrix.Translation([offset[i] / full_res[i] for i in range(3)])
+            crop_sca = mathutils.Matrix()
+            crop_sca[0][0] = nx / full_res[0]
+            crop_sca[1][1] = ny / full_res[1]
+            crop_sca[2][2] = nz / full_res[2]
+            tex_crop = crop_loc * crop_sca
+        else:
+            tex_crop = mathutils.Matrix()
+
+        self._report_memory(full_size, len(grid))
 
         scale = self.domain.dimensions
         translate = self.domain.matrix_world * mathutils.Vector([v for v in self.domain.bound_box[0]])
@@ -82,7 +121,7 @@ class LuxCoreNodeTexSmoke(LuxCoreNodeTexture):
 
         # combine transformations
         mapping_type = 'globalmapping3d'
-        matrix_transformation = utils.matrix_to_list(tex_loc * tex_rot * tex_sca, invert=True)
+        matrix_transformation = utils.matrix_to_list(tex_loc * tex_rot * tex_sca * tex_crop, invert=True)
 
         definitions = {
             "type": "densitygrid",
@@ -90,10 +129,20 @@ class LuxCoreNodeTexSmoke(LuxCoreNodeTexture):
             "nx": nx,
             "ny": ny,
             "nz": nz,
-            "data": grid,
+            "storage": self.storage,
             # Mapping
             "mapping.type": mapping_type,
             "mapping.transformation": matrix_transformation,
         }
 
-        return self.base_export(props, definitions, luxcore_name)
+        luxcore_name = self.base_export(props, definitions, luxcore_name)
+        # The grid is set separately to avoid a temporary list of millions of Python floats
+        props.Set(smoke.create_grid_property(self.prefix + luxcore_name + ".data", grid))
+        return luxcore_name
+
+    def _report_memory(self, full_size, voxel_count):
+        bytes_per_voxel = {"float": 4, "half": 2, "byte": 1}[self.storage]
+        size = voxel_count * bytes_per_voxel
+        saved = full_size - size
+        print('[%s] Smoke grid "%s": %.1f MB (saved %.1f MB, %.0f%%)'
+              % (self.domain.name, self.source, size / 1024 ** 2, saved / 1024 ** 2, saved / full_size * 100))
@@ -3,6 +3,7 @@ from bpy.types import NodeTree
 import nodeitems_utils
 from nodeitems_utils import NodeCategory, NodeItem, NodeItemCustom
 from ...ui import ICON_VOLUME
+from ...utils import node as utils_node
 from ..output import get_active_output
 
 from .output import LuxCoreNodeVolOutput
@@ -48,6 +49,7 @@ class LuxCoreVolumeNodeTree(NodeTree):
 
     # This block updates the preview, when socket links change
     def update(self):
+        utils_node.NodeTreeIndex.invalidate(self)
         self.refresh = True
 
     def acknowledge_connection(self, context):
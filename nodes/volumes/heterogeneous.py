@@ -1,5 +1,8 @@
+import math
 from bpy.props import IntProperty, BoolProperty, FloatProperty
 from .. import utils
+from ...export import smoke
+from ...utils import node as utils_node
 from .. import LuxCoreNodeVolume, COLORDEPTH_DESC
 
 
@@ -9,6 +12,11 @@ STEP_SIZE_DESCRIPTION = (
     "If it is too small, the rendering will be much slower"
 )
 
+AUTO_STEP_SIZE_DESCRIPTION = (
+    "Derive the step size from the voxel size of the smoke textures linked to this volume. "
+    "Falls back to the manual settings if no smoke texture with valid domain is found"
+)
+
 MULTISCATTERING_DESC = (
     "Simulate multiple scattering events per ray. "
     "Makes volumes with high scattering scale appear more realistic, "
@@ -30,6 +38,8 @@ class LuxCoreNodeVolHeterogeneous(LuxCoreNodeVolume):
                               soft_min=0.01, soft_max=1,
                               subtype="DISTANCE", unit="LENGTH",
                               description=STEP_SIZE_DESCRIPTION)
+    use_auto_step_size = BoolProperty(name="Auto Step Size", default=False,
+                                      description=AUTO_STEP_SIZE_DESCRIPTION)
     maxcount = IntProperty(name="Max. Step Count", default=1024, min=0,
                            description="Maximum Step Count for Volume Integration")
 
@@ -46,17 +56,77 @@ class LuxCoreNodeVolHeterogeneous(LuxCoreNodeVolume):
 
     def draw_buttons(self, context, layout):
         layout.prop(self, "multiscattering")
-        layout.prop(self, "step_size")
-        layout.prop(self, "maxcount")
+        layout.prop(self, "use_auto_step_size")
+        auto_steps = self._calc_auto_steps() if self.use_auto_step_size else None
+
+        if auto_steps:
+            step_size, maxcount = auto_steps
+            layout.label("Step Size: %.4g, Max. Steps: %d" % (step_size, maxcount))
+        else:
+            layout.prop(self, "step_size")
+            layout.prop(self, "maxcount")
         self.draw_common_buttons(context, layout)
 
     def export(self, props, luxcore_name=None):
+        auto_steps = self._calc_auto_steps() if self.use_auto_step_size else None
+        if auto_steps:
+            step_size, maxcount = auto_steps
+        else:
+            step_size, maxcount = self.step_size, self.maxcount
+
         definitions = {
             "type": "heterogeneous",
-            "steps.size": self.step_size,
-            "steps.maxcount": self.maxcount,
+            "steps.size": step_size,
+            "steps.maxcount": maxcount,
             "asymmetry": self.inputs["Asymmetry"].export(props),
             "multiscattering": self.multiscattering,
         }
         self.export_common_inputs(props, definitions)
         return self.base_export(props, definitions, luxcore_name)
+
+    def _calc_auto_steps(self):
+        """
+        Returns (step_size, maxcount) matching the finest smoke grid that feeds this volume,
+        or None if no smoke texture is linked. One step per voxel is enough to sample all
+        details of the grid, and the step count has to be large enough to cross the domain.
+        """
+        step_size = None
+        max_length = 0
+
+        for domain in self._find_smoke_domains():
+            voxel_size = smoke.get_voxel_size(domain)
+            if voxel_size is None:
+                continue
+
+            smallest = min(voxel_size)
+            if smallest > 0 and (step_size is None or smallest < step_size):
+                step_size = smallest
+            # The longest possible path through the domain
+            max_length = max(max_length, domain.dimensions.length)
+
+        if step_size is None:
+            return None
+
+        maxcount = math.ceil(max_length / step_size) + 1
+        return step_size, maxcount
+
+    def _find_smoke_domains(self):
+        domains = set()
+        visited = set()
+        stack = [self]
+
+        while stack:
+            node = stack.pop()
+            if node.name in visited:
+                continue
+            visited.add(node.name)
+
+            if node.bl_idname == "LuxCoreNodeTexSmoke" and node.domain:
+                domains.add(node.domain)
+
+            for socket in node.inputs:
+                linked = utils_node.get_linked_node(socket)
+                if linked:
+                    stack.append(linked)
+
+        return domains
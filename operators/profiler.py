@@ -0,0 +1,35 @@
+import bpy
+import json
+from bpy.props import StringProperty
+from bpy_extras.io_utils import ExportHelper
+
+
+class LUXCORE_OT_profiler_save(bpy.types.Operator, ExportHelper):
+    bl_idname = "luxcore.profiler_save"
+    bl_label = "Save as JSON"
+    bl_description = "Save the results of the export profiler to a JSON file"
+
+    filename_ext = ".json"
+    filter_glob = StringProperty(default="*.json", options={"HIDDEN"})
+
+    @classmethod
+    def poll(cls, context):
+        profiler = context.scene.luxcore.profiler
+        return bool(profiler.node_types or profiler.node_trees)
+
+    def execute(self, context):
+        with open(self.filepath, "w") as file:
+            json.dump(context.scene.luxcore.profiler.to_dict(), file, indent=4)
+
+        self.report({"INFO"}, "Saved profiler results to " + self.filepath)
+        return {"FINISHED"}
+
+
+class LUXCORE_OT_profiler_clear(bpy.types.Operator):
+    bl_idname = "luxcore.profiler_clear"
+    bl_label = "Clear"
+    bl_description = "Delete the results of the export profiler"
+
+    def execute(self, context):
+        context.scene.luxcore.profiler.clear()
+        return {"FINISHED"}
@@ -1,7 +1,7 @@
 import bpy
 from . import (
     blender_object, camera, config, display, errorlog, halt,
-    light, material, opencl, particle, world
+    light, material, opencl, particle, profiler, world
 )
 from bpy.props import PointerProperty
 
@@ -23,3 +23,4 @@ class LuxCoreScene(bpy.types.PropertyGroup):
     halt = PointerProperty(type=halt.LuxCoreHaltConditions)
     display = PointerProperty(type=display.LuxCoreDisplaySettings)
     opencl = PointerProperty(type=opencl.LuxCoreOpenCLSettings)
+    profiler = PointerProperty(type=profiler.LuxCoreExportProfiler)
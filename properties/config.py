@@ -105,6 +105,15 @@ class LuxCoreConfigTile(PropertyGroup):
     # tile.multipass.convergencetest.warmup.count
     # multipass_convtest_warmup = IntProperty(name="Convergence Warmup", default=32, min=0, soft_max=128)
 
+LIGHT_STRATEGY_AUTO_DESC = (
+    "Uniform if the light importance is estimated automatically, "
+    "otherwise Log Power or Power depending on how different the lamps are"
+)
+AUTO_LIGHT_IMPORTANCE_DESC = (
+    "Estimate the importance of each lamp from its power, size and distance to the camera "
+    "(replaces the importance set on the lamps, sun and hemi lamps are not affected)"
+)
+
 
 class LuxCoreConfig(PropertyGroup):
     """
@@ -169,6 +178,17 @@ class LuxCoreConfig(PropertyGroup):
     gaussian_alpha = FloatProperty(name="Gaussian Filter Alpha", default=2, min=0.1, max=10,
                                    description="Gaussian rate of falloff. Lower values give blurrier images.")
 
+    # Light sampling
+    light_strategies = [
+        ("AUTO", "Auto", LIGHT_STRATEGY_AUTO_DESC, 0),
+        ("LOG_POWER", "Log Power", "Sample lamps according to the logarithm of their power (LuxCore default)", 1),
+        ("POWER", "Power", "Sample lamps according to their power", 2),
+        ("UNIFORM", "Uniform", "Sample all lamps equally (only their importance is used)", 3),
+    ]
+    light_strategy = EnumProperty(name="Light Strategy", items=light_strategies, default="LOG_POWER")
+    use_auto_light_importance = BoolProperty(name="Auto Light Importance", default=False,
+                                             description=AUTO_LIGHT_IMPORTANCE_DESC)
+
     # FILESAVER options
     use_filesaver = BoolProperty(name="Only write LuxCore scene", default=False)
     filesaver_format_items = [
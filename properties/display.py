@@ -1,5 +1,5 @@
 import bpy
-from bpy.props import IntProperty
+from bpy.props import BoolProperty, IntProperty
 
 
 class LuxCoreDisplaySettings(bpy.types.PropertyGroup):
@@ -7,3 +7,13 @@ class LuxCoreDisplaySettings(bpy.types.PropertyGroup):
                            description="Time between film refreshes, in seconds")
     viewport_halt_time = IntProperty(name="Viewport Halt Time (s)", default=10, min=1,
                                      description="How long to render in the viewport")
+    use_texture_proxies = BoolProperty(name="Downscale Textures", default=True,
+                                       description="Use downscaled copies of large image files in the viewport "
+                                                   "to reduce loading time and memory usage")
+    texture_proxy_size = IntProperty(name="Max. Texture Size", default=1024, min=64, soft_max=4096,
+                                     subtype="PIXEL",
+                                     description="Images larger than this are downscaled in the viewport")
+    smoke_cache_size = IntProperty(name="Smoke Cache Size (MB)", default=512, min=0,
+                                   description="Memory budget for exported smoke grids. They are reused "
+                                               "e.g. when a material is edited in the viewport. "
+                                               "0 disables the cache")
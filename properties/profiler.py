@@ -0,0 +1,59 @@
+import bpy
+from bpy.props import BoolProperty, CollectionProperty, FloatProperty, IntProperty
+from bpy.types import PropertyGroup
+from ..utils.node import NodeExportProfiler
+
+ENABLE_DESCRIPTION = (
+    "Measure the export time and the number of properties of each node type and material. "
+    "The results are updated when a final or viewport render is started"
+)
+
+
+class LuxCoreProfilerEntry(PropertyGroup):
+    # name is inherited from PropertyGroup
+    time = FloatProperty(name="Time (ms)", description="Time spent in the export")
+    props = IntProperty(name="Properties", description="Number of LuxCore properties defined")
+    calls = IntProperty(name="Calls", description="How often the export was called")
+
+
+class LuxCoreExportProfiler(PropertyGroup):
+    enable = BoolProperty(name="Enable", default=False, description=ENABLE_DESCRIPTION)
+    node_types = CollectionProperty(type=LuxCoreProfilerEntry)
+    node_types_index = IntProperty()
+    node_trees = CollectionProperty(type=LuxCoreProfilerEntry)
+    node_trees_index = IntProperty()
+
+    def update_results(self):
+        """ Copy the results of the last export from the NodeExportProfiler """
+        self._fill(self.node_types, NodeExportProfiler.node_types)
+        self._fill(self.node_trees, NodeExportProfiler.node_trees)
+
+    def clear(self):
+        self.node_types.clear()
+        self.node_trees.clear()
+
+    def to_dict(self):
+        return {
+            "node_types": [self._entry_to_dict(entry) for entry in self.node_types],
+            "node_trees": [self._entry_to_dict(entry) for entry in self.node_trees],
+        }
+
+    @staticmethod
+    def _fill(collection, stats):
+        collection.clear()
+
+        for name, (elapsed, count, calls) in stats.items():
+            entry = collection.add()
+            entry.name = name
+            entry.time = elapsed * 1000
+            entry.props = count
+            entry.calls = calls
+
+    @staticmethod
+    def _entry_to_dict(entry):
+        return {
+            "name": entry.name,
+            "time_ms": entry.time,
+            "properties": entry.props,
+            "calls": entry.calls,
+        }
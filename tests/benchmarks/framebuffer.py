@@ -0,0 +1,75 @@
+"""
+Measures the cost of one refresh of the final render framebuffer (FrameBufferFinal.draw)
+at several resolutions. Use it to compare changes to the transfer of the film to Blender.
+
+Run it like this (no .blend file needed):
+blender --addons BlendLuxCore --factory-startup -noaudio -b --python framebuffer.py
+"""
+
+import bpy
+import sys
+from time import time
+
+# import the already loaded addon
+from BlendLuxCore.draw import FrameBufferFinal
+
+RESOLUTIONS = [
+    (1920, 1080),
+    (3840, 2160),
+    (7680, 4320),
+]
+REFRESHES = 3
+
+# {(width, height): seconds per refresh}
+results = {}
+
+
+class Film:
+    """ Only the transfer to Blender is measured, the film output is left as it is """
+    def GetOutputFloat(self, output_type, buffer):
+        pass
+
+
+class Session:
+    def GetFilm(self):
+        return Film()
+
+
+class FrameBufferBenchmarkEngine(bpy.types.RenderEngine):
+    bl_idname = "LUXCORE_FRAMEBUFFER_BENCHMARK"
+    bl_label = "LuxCore Framebuffer Benchmark"
+
+    def render(self, scene):
+        framebuffer = FrameBufferFinal(scene)
+        session = Session()
+        width = scene.render.resolution_x
+        height = scene.render.resolution_y
+
+        start = time()
+        for i in range(REFRESHES):
+            framebuffer.draw(self, session)
+        results[(width, height)] = (time() - start) / REFRESHES
+
+
+def main():
+    bpy.utils.register_class(FrameBufferBenchmarkEngine)
+    scene = bpy.context.scene
+    scene.render.engine = FrameBufferBenchmarkEngine.bl_idname
+    scene.render.resolution_percentage = 100
+    scene.render.use_border = False
+
+    for width, height in RESOLUTIONS:
+        scene.render.resolution_x = width
+        scene.render.resolution_y = height
+        bpy.ops.render.render()
+
+    print()
+    print("Resolution     Time per refresh")
+    for width, height in RESOLUTIONS:
+        print("%-14s %.3fs" % ("%dx%d" % (width, height), results[(width, height)]))
+
+    bpy.utils.unregister_class(FrameBufferBenchmarkEngine)
+
+
+main()
+sys.exit(0)
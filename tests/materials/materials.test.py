@@ -5,6 +5,7 @@ import BlendLuxCore
 from BlendLuxCore.bin import pyluxcore
 from BlendLuxCore import utils
 from BlendLuxCore.nodes.output import get_active_output
+from BlendLuxCore.utils.node import ConstantFolding
 import bpy
 
 
@@ -198,8 +199,152 @@ class TestMaterials(unittest.TestCase):
         # TODO the rest of the properties
 
 
+class TestConstantFolding(unittest.TestCase):
+    """
+    Math and colormix nodes with known results are replaced by their value or input.
+    The node trees are created here because the .blend only contains materials.
+    """
+    def setUp(self):
+        self.node_tree = bpy.data.node_groups.new("constant_folding", "luxcore_texture_nodes")
+        self.props = pyluxcore.Properties()
+        ConstantFolding.reset()
+
+    def tearDown(self):
+        bpy.data.node_groups.remove(self.node_tree)
+
+    def new_node(self, bl_idname, mode):
+        node = self.node_tree.nodes.new(bl_idname)
+        node.mode = mode
+        return node
+
+    def link_texture(self, socket):
+        """ Links a texture that can not be folded, returns its LuxCore name """
+        fbm = self.node_tree.nodes.new("LuxCoreNodeTexfBM")
+        self.node_tree.links.new(fbm.outputs[0], socket)
+        return fbm.export(pyluxcore.Properties())
+
+    def get_texture_types(self):
+        return [self.props.Get(prefix + ".type").GetString()
+                for prefix in self.props.GetAllUniqueSubNames("scene.textures")]
+
+    def test_constant_inputs(self):
+        node = self.new_node("LuxCoreNodeTexMath", "add")
+        node.inputs[0].default_value = 0.3
+        node.inputs[1].default_value = 0.4
+
+        assertAlmostEqual(self, node.export(self.props), 0.7)
+        self.assertEqual(self.get_texture_types(), [])
+        self.assertEqual(ConstantFolding.removed, 1)
+
+    def test_multiply_by_one(self):
+        node = self.new_node("LuxCoreNodeTexMath", "scale")
+        linked_name = self.link_texture(node.inputs[0])
+        node.inputs[1].default_value = 1
+
+        self.assertEqual(node.export(self.props), linked_name)
+        self.assertEqual(self.get_texture_types(), ["fbm"])
+
+    def test_multiply_by_one_swapped(self):
+        node = self.new_node("LuxCoreNodeTexMath", "scale")
+        node.inputs[0].default_value = 1
+        linked_name = self.link_texture(node.inputs[1])
+
+        self.assertEqual(node.export(self.props), linked_name)
+        self.assertEqual(self.get_texture_types(), ["fbm"])
+
+    def test_multiply_by_zero(self):
+        node = self.new_node("LuxCoreNodeTexMath", "scale")
+        self.link_texture(node.inputs[0])
+        node.inputs[1].default_value = 0
+
+        assertAlmostEqual(self, node.export(self.props), 0)
+        # The linked texture is not needed and must not be exported
+        self.assertEqual(self.get_texture_types(), [])
+
+    def test_add_zero(self):
+        node = self.new_node("LuxCoreNodeTexMath", "add")
+        node.inputs[0].default_value = 0
+        linked_name = self.link_texture(node.inputs[1])
+
+        self.assertEqual(node.export(self.props), linked_name)
+        self.assertEqual(self.get_texture_types(), ["fbm"])
+
+    def test_subtract_zero(self):
+        node = self.new_node("LuxCoreNodeTexMath", "subtract")
+        linked_name = self.link_texture(node.inputs[0])
+        node.inputs[1].default_value = 0
+
+        self.assertEqual(node.export(self.props), linked_name)
+        self.assertEqual(self.get_texture_types(), ["fbm"])
+
+    def test_subtract_from_zero(self):
+        # 0 - texture is not the texture, subtraction is not commutative
+        node = self.new_node("LuxCoreNodeTexMath", "subtract")
+        node.inputs[0].default_value = 0
+        linked_name = self.link_texture(node.inputs[1])
+
+        luxcore_name = node.export(self.props)
+        self.assertNotEqual(luxcore_name, linked_name)
+        prefix = "scene.textures." + luxcore_name
+        self.assertEqual(self.props.Get(prefix + ".type").GetString(), "subtract")
+        self.assertEqual(self.props.Get(prefix + ".texture2").GetString(), linked_name)
+        self.assertEqual(ConstantFolding.removed, 0)
+
+    def test_mix_amount_0_and_1(self):
+        node = self.new_node("LuxCoreNodeTexMath", "mix")
+        linked_name = self.link_texture(node.inputs[0])
+        node.inputs[1].default_value = 0.25
+
+        node.inputs[2].default_value = 0
+        self.assertEqual(node.export(self.props), linked_name)
+
+        node.inputs[2].default_value = 1
+        assertAlmostEqual(self, node.export(pyluxcore.Properties()), 0.25)
+
+    def test_colormix_amount_0_and_1(self):
+        node = self.new_node("LuxCoreNodeTexColorMix", "mix")
+        linked_name = self.link_texture(node.inputs["Color 1"])
+        node.inputs["Color 2"].default_value = (0.1, 0.2, 0.3)
+
+        node.inputs["Fac"].default_value = 0
+        self.assertEqual(node.export(self.props), linked_name)
+
+        node.inputs["Fac"].default_value = 1
+        assertListsAlmostEqual(self, node.export(pyluxcore.Properties()), [0.1, 0.2, 0.3])
+
+    def test_colormix_constant_inputs(self):
+        node = self.new_node("LuxCoreNodeTexColorMix", "scale")
+        node.inputs["Color 1"].default_value = (0.5, 0.5, 0.5)
+        node.inputs["Color 2"].default_value = (0.2, 0.4, 0.6)
+
+        assertListsAlmostEqual(self, node.export(self.props), [0.1, 0.2, 0.3])
+        self.assertEqual(self.get_texture_types(), [])
+
+    def test_clamp_output_constant(self):
+        node = self.new_node("LuxCoreNodeTexMath", "add")
+        node.inputs[0].default_value = 0.8
+        node.inputs[1].default_value = 0.5
+        node.clamp_output = True
+
+        assertAlmostEqual(self, node.export(self.props), 1)
+        self.assertEqual(self.get_texture_types(), [])
+
+    def test_clamp_output_linked(self):
+        # The identity fold would skip the clamp, so the node has to be exported
+        node = self.new_node("LuxCoreNodeTexMath", "scale")
+        linked_name = self.link_texture(node.inputs[0])
+        node.inputs[1].default_value = 1
+        node.clamp_output = True
+
+        luxcore_name = node.export(self.props)
+        self.assertNotEqual(luxcore_name, linked_name)
+        self.assertEqual(self.props.Get("scene.textures." + luxcore_name + ".type").GetString(), "clamp")
+        self.assertEqual(ConstantFolding.removed, 0)
+
+
 # we have to manually invoke the test runner here, as we cannot use the CLI
 suite = unittest.defaultTestLoader.loadTestsFromTestCase(TestMaterials)
+suite.addTests(unittest.defaultTestLoader.loadTestsFromTestCase(TestConstantFolding))
 result = unittest.TextTestRunner().run(suite)
 
 sys.exit(not result.wasSuccessful())
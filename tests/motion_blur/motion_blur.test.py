@@ -3,7 +3,7 @@ import sys
 
 import BlendLuxCore
 from BlendLuxCore.bin import pyluxcore
-from BlendLuxCore.export import Exporter
+from BlendLuxCore.export import Exporter, motion_blur
 from BlendLuxCore import utils
 import bpy
 from mathutils import Matrix, Vector
@@ -222,8 +222,122 @@ class TestMotionBlur(unittest.TestCase):
         assertListsAlmostEqual(self, transformation_step_1, expected_step_1)
 
 
+class TestMotionBlurSampling(unittest.TestCase):
+    """
+    Tests which objects are sampled by motion_blur.convert().
+    The test objects are empties created here, the exporter does not need to know them.
+    """
+    def setUp(self):
+        self.scene = bpy.context.scene
+        self.scene.camera = bpy.data.objects["static_camera"]
+        self.scene.frame_set(TEST_FRAME, TEST_SUBFRAME)
+        motion_blur.TransformCache.clear()
+
+        self.created_objects = []
+        self.exported_objects = {}
+
+        # Count the frame changes, every sample of the shutter interval needs one
+        self.frame_changes = 0
+        self.frame_change_handler = lambda scene: self.count_frame_change()
+        bpy.app.handlers.frame_change_pre.append(self.frame_change_handler)
+
+    def tearDown(self):
+        bpy.app.handlers.frame_change_pre.remove(self.frame_change_handler)
+        motion_blur.TransformCache.clear()
+
+        for obj in self.created_objects:
+            bpy.data.objects.remove(obj, do_unlink=True)
+        self.scene.frame_set(TEST_FRAME, TEST_SUBFRAME)
+
+    def count_frame_change(self):
+        self.frame_changes += 1
+
+    def new_empty(self, name, parent=None):
+        """ Returns the empty and its prefix in the motion blur props """
+        obj = bpy.data.objects.new(name, None)
+        obj.parent = parent
+        self.scene.objects.link(obj)
+        self.created_objects.append(obj)
+
+        luxcore_name = utils.get_luxcore_name(obj, is_viewport_render=False)
+        self.exported_objects[utils.make_key(obj)] = utils.ExportedObject([[luxcore_name, 0]])
+        return obj, "scene.objects." + luxcore_name + "."
+
+    def test_static_object_skipped(self):
+        static_obj, prefix = self.new_empty("static_empty")
+        self.assertTrue(motion_blur._is_static(static_obj))
+
+        props, is_camera_moving = motion_blur.convert(None, self.scene, [static_obj], self.exported_objects)
+
+        # The object was not sampled, so the frame was never changed
+        self.assertEqual(self.frame_changes, 0)
+        self.assertEqual(props.GetAllNames(), [])
+        self.assertFalse(is_camera_moving)
+
+    def test_child_of_animated_parent(self):
+        # The child has no animation itself, but moves with its parent
+        moving_obj = bpy.data.objects["moving_obj"]
+        child, prefix = self.new_empty("child_of_moving_obj", parent=moving_obj)
+        self.assertFalse(motion_blur._is_static(child))
+
+        props, is_camera_moving = motion_blur.convert(None, self.scene, [child], self.exported_objects)
+
+        self.assertGreater(self.frame_changes, 0)
+        # Same location as the parent
+        test_moving_object(self, props, prefix)
+
+    def test_child_of_animated_curve_path(self):
+        # The object does not move by itself, but the path animation of the curve moves it
+        curve = bpy.data.curves.new("animated_path", "CURVE")
+        # Cleanups run after tearDown(), when the object using the curve is already removed
+        self.addCleanup(bpy.data.curves.remove, curve)
+        curve.use_path = True
+        curve.keyframe_insert("eval_time", frame=1)
+        curve_obj = bpy.data.objects.new("animated_path", curve)
+        self.scene.objects.link(curve_obj)
+        self.created_objects.append(curve_obj)
+
+        child, prefix = self.new_empty("child_of_path", parent=curve_obj)
+        self.assertTrue(motion_blur._is_static(curve_obj))
+        self.assertFalse(motion_blur._is_static(child))
+
+    def test_cached_subframe_samples(self):
+        moving_obj = bpy.data.objects["moving_obj"]
+        luxcore_name = utils.get_luxcore_name(moving_obj, is_viewport_render=False)
+        exported_objects = {utils.make_key(moving_obj): utils.ExportedObject([[luxcore_name, 0]])}
+        prefix = "scene.objects." + luxcore_name + "."
+
+        # The shutter is 4 frames long, so the interval of frame 1.5 ends
+        # at frame 3.5, where the interval of frame 5.5 starts
+        self.scene.frame_set(1, 0.5)
+        motion_blur.convert(None, self.scene, [moving_obj], exported_objects)
+
+        self.scene.frame_set(5, 0.5)
+        self.frame_changes = 0
+        cached_props, _ = motion_blur.convert(None, self.scene, [moving_obj], exported_objects)
+        cached_frame_changes = self.frame_changes
+
+        motion_blur.TransformCache.clear()
+        self.scene.frame_set(5, 0.5)
+        self.frame_changes = 0
+        fresh_props, _ = motion_blur.convert(None, self.scene, [moving_obj], exported_objects)
+
+        # The first step was taken from the cache instead of changing the frame
+        self.assertLess(cached_frame_changes, self.frame_changes)
+
+        self.assertEqual(sorted(cached_props.GetAllNames()), sorted(fresh_props.GetAllNames()))
+        for name in fresh_props.GetAllNames():
+            assertListsAlmostEqual(self, cached_props.Get(name).GetFloats(), fresh_props.Get(name).GetFloats())
+
+        # The cached step is identical to the transformation after a frame_set() to its subframe
+        self.scene.frame_set(3, 0.5)
+        expected = utils.matrix_to_list(moving_obj.matrix_world, self.scene, apply_worldscale=True)
+        assertListsAlmostEqual(self, cached_props.Get(prefix + "motion.0.transformation").GetFloats(), expected)
+
+
 # we have to manually invoke the test runner here, as we cannot use the CLI
 suite = unittest.defaultTestLoader.loadTestsFromTestCase(TestMotionBlur)
+suite.addTests(unittest.defaultTestLoader.loadTestsFromTestCase(TestMotionBlurSampling))
 result = unittest.TextTestRunner().run(suite)
 
 sys.exit(not result.wasSuccessful())
@@ -107,6 +107,11 @@ class LUXCORE_RENDER_PT_config(RenderButtonsPanel, Panel):
         if config.filter == "GAUSSIAN":
             layout.prop(config, "gaussian_alpha")
 
+        # Light sampling settings
+        row = layout.row()
+        row.prop(config, "light_strategy")
+        row.prop(config, "use_auto_light_importance")
+
         # Seed settings
         row = layout.row(align=True)
         sub = row.row(align=True)
@@ -17,6 +17,14 @@ class LUXCORE_RENDER_PT_display_settings(RenderButtonsPanel, Panel):
 
         layout.label("Viewport Render:")
         layout.prop(display, "viewport_halt_time")
+        row = layout.row()
+        row.prop(display, "use_texture_proxies")
+        sub = row.row()
+        sub.active = display.use_texture_proxies
+        sub.prop(display, "texture_proxy_size")
 
         layout.label("Final Render:")
         layout.prop(display, "interval")
+
+        layout.label("Caches:")
+        layout.prop(display, "smoke_cache_size")
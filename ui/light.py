@@ -1,5 +1,6 @@
 from bl_ui.properties_data_lamp import DataButtonsPanel
 from bpy.types import Panel
+from ..export.importance import LightImportanceEstimator
 
 # TODO: add warning/info label about gain problems (e.g. "why is my HDRI black when a sun is in the scene")
 
@@ -150,7 +151,15 @@ class LUXCORE_LAMP_PT_performance(DataButtonsPanel, Panel):
         lamp = context.lamp
 
         layout.prop(lamp.luxcore, "samples")
-        layout.prop(lamp.luxcore, "importance")
+
+        if context.scene.luxcore.config.use_auto_light_importance and lamp.type not in {"SUN", "HEMI"}:
+            estimated = LightImportanceEstimator.get(context.object)
+            if estimated is None:
+                layout.label("Importance: estimated during export", icon="INFO")
+            else:
+                layout.label("Estimated Importance: %.4f" % estimated, icon="INFO")
+        else:
+            layout.prop(lamp.luxcore, "importance")
 
         if lamp.type == "HEMI":
             # infinite (with image) and constantinfinte lights
@@ -0,0 +1,73 @@
+import bpy
+from bl_ui.properties_render import RenderButtonsPanel
+from bpy.props import EnumProperty
+from bpy.types import Panel, UIList
+
+
+class LUXCORE_UL_profiler(UIList):
+    sort_items = [
+        ("time", "Time", "Slowest first"),
+        ("props", "Properties", "Most properties first"),
+        ("calls", "Calls", "Most calls first"),
+        ("name", "Name", "Alphabetical"),
+    ]
+    sort_by = EnumProperty(name="Sort By", items=sort_items, default="time")
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row()
+        row.label(item.name)
+        row.label("%.2f ms" % item.time)
+        row.label("%d props" % item.props)
+        row.label("%d calls" % item.calls)
+
+    def draw_filter(self, context, layout):
+        row = layout.row()
+        row.prop(self, "filter_name", text="")
+        row.prop(self, "sort_by", expand=True)
+
+    def filter_items(self, context, data, propname):
+        items = getattr(data, propname)
+        helper = bpy.types.UI_UL_list
+
+        flags = helper.filter_items_by_name(self.filter_name, self.bitflag_filter_item, items)
+
+        if self.sort_by == "name":
+            order = helper.sort_items_by_name(items)
+        else:
+            sort_data = [(index, getattr(item, self.sort_by)) for index, item in enumerate(items)]
+            order = helper.sort_items_helper(sort_data, key=lambda elem: elem[1], reverse=True)
+
+        return flags, order
+
+
+class LUXCORE_RENDER_PT_profiler(RenderButtonsPanel, Panel):
+    COMPAT_ENGINES = {"LUXCORE"}
+    bl_label = "LuxCore Export Profiler"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    @classmethod
+    def poll(cls, context):
+        return context.scene.render.engine == "LUXCORE"
+
+    def draw_header(self, context):
+        self.layout.prop(context.scene.luxcore.profiler, "enable", text="")
+
+    def draw(self, context):
+        layout = self.layout
+        profiler = context.scene.luxcore.profiler
+
+        if not profiler.node_types and not profiler.node_trees:
+            layout.label("Enable and start a render to see results", icon="INFO")
+            return
+
+        row = layout.row(align=True)
+        row.operator("luxcore.profiler_save", icon="SAVE_AS")
+        row.operator("luxcore.profiler_clear", icon="X")
+
+        layout.label("Node Types:")
+        layout.template_list("LUXCORE_UL_profiler", "node_types", profiler, "node_types",
+                             profiler, "node_types_index", rows=5)
+
+        layout.label("Materials and Volumes:")
+        layout.template_list("LUXCORE_UL_profiler", "node_trees", profiler, "node_trees",
+                             profiler, "node_trees_index", rows=5)
@@ -1,4 +1,8 @@
 import bpy
+import hashlib
+import threading
+from contextlib import contextmanager
+from time import time
 from ..bin import pyluxcore
 from . import find_active_uv
 
@@ -38,8 +42,338 @@ def get_linked_node(socket):
     return socket.links[0].from_node
 
 
+class NodeExportMemo(object):
+    """
+    This class is a singleton.
+    Remembers the LuxCore names of the nodes exported into a Properties object.
+    If a node is linked to several sockets (e.g. color and bump), it and the
+    nodes linked to its inputs are only exported once.
+    The memo is only valid for one Properties object, it is reset when another one is passed.
+    """
+    props = None
+    # {(node key, output socket identifier): luxcore_name}
+    names = {}
+
+    @classmethod
+    def get(cls, props, link):
+        if props is not cls.props:
+            cls.props = props
+            cls.names = {}
+        return cls.names.get(_make_link_key(link))
+
+    @classmethod
+    def add(cls, props, link, luxcore_name):
+        if props is cls.props and luxcore_name is not None:
+            cls.names[_make_link_key(link)] = luxcore_name
+
+    @classmethod
+    def clear(cls):
+        cls.props = None
+        cls.names = {}
+
+
+def _make_link_key(link):
+    return link.from_node.as_pointer(), link.from_socket.identifier
+
+
+class ConstantFolding(object):
+    """
+    This class is a singleton.
+    Counts the texture nodes that were not exported because their result is known at
+    export time (e.g. a math node with two unlinked inputs, or a multiplication by 1).
+    Such nodes are replaced by their value or input, so LuxCore does not have to
+    evaluate them at every shading point.
+    """
+    removed = 0
+
+    @classmethod
+    def add(cls):
+        cls.removed += 1
+
+    @classmethod
+    def reset(cls):
+        cls.removed = 0
+
+
+def is_constant(value):
+    """ Returns True if value is an exported number or color, False if it is a texture name """
+    if isinstance(value, (list, tuple)):
+        return all(isinstance(elem, (int, float)) for elem in value)
+    return isinstance(value, (int, float))
+
+
+def is_constant_equal(value, number):
+    if not is_constant(value):
+        return False
+    if isinstance(value, (list, tuple)):
+        return all(elem == number for elem in value)
+    return value == number
+
+
+def fold_constants(func, *values):
+    """
+    Applies func to each component of the constant values.
+    Numbers are broadcast to colors if any of the values is a color.
+    """
+    if all(isinstance(value, (int, float)) for value in values):
+        return func(*values)
+
+    values = [[value] * 3 if isinstance(value, (int, float)) else value for value in values]
+    return [func(*components) for components in zip(*values)]
+
+
+def fold_operation(props, mode, socket1, socket2=None, amount=None, clamp_range=(0, 1)):
+    """
+    Constant folding for the operations of the math and colormix texture nodes.
+    Returns the result if it is known at export time, the exported input if the operation
+    does not change it (e.g. multiply by 1 or mix with amount 0), or None if a texture is needed.
+    Inputs whose result is not needed (e.g. the other input of a multiplication by 0) are not exported.
+    """
+    if mode == "abs":
+        value = socket1.export(props)
+        return fold_constants(abs, value) if is_constant(value) else None
+
+    if mode == "clamp":
+        value = socket1.export(props)
+        low, high = clamp_range
+        if is_constant(value) and is_constant(low) and is_constant(high):
+            return fold_constants(lambda v, l, h: min(max(v, l), h), value, low, high)
+        return None
+
+    if mode == "mix":
+        fac = amount.export(props)
+        if is_constant_equal(fac, 0):
+            return socket1.export(props)
+        if is_constant_equal(fac, 1):
+            return socket2.export(props)
+
+        value1 = socket1.export(props)
+        value2 = socket2.export(props)
+        if is_constant(fac) and is_constant(value1) and is_constant(value2):
+            return fold_constants(lambda v1, v2, f: v1 * (1 - f) + v2 * f, value1, value2, fac)
+        return None
+
+    if mode not in FOLDABLE_OPERATIONS:
+        return None
+
+    # Export unlinked inputs first, a multiplication by 0 makes the linked input unnecessary
+    sockets = (socket1, socket2)
+    order = (1, 0) if socket1.is_linked and not socket2.is_linked else (0, 1)
+    values = [None, None]
+
+    for index in order:
+        values[index] = sockets[index].export(props)
+        if mode == "scale" and is_constant_equal(values[index], 0):
+            return values[index]
+
+    value1, value2 = values
+    if is_constant(value1) and is_constant(value2):
+        return fold_constants(FOLDABLE_OPERATIONS[mode], value1, value2)
+
+    # Identity operations
+    neutral = 1 if mode == "scale" else 0
+    if is_constant_equal(value2, neutral):
+        return value1
+    if mode != "subtract" and is_constant_equal(value1, neutral):
+        return value2
+    return None
+
+
+FOLDABLE_OPERATIONS = {
+    "scale": lambda v1, v2: v1 * v2,
+    "add": lambda v1, v2: v1 + v2,
+    "subtract": lambda v1, v2: v1 - v2,
+}
+
+
+class TextureDeduplication(object):
+    """
+    This class is a singleton.
+    Gives textures with identical definitions the same LuxCore name, so e.g. 300 materials
+    with their own imagemap node on the same file only define one texture in LuxCore.
+    The names are derived from the definitions, so inputs that were deduplicated
+    themselves make their users identical, too.
+    Only enabled in final renders: in the viewport, every edit would give the texture
+    a new name and the old definition would stay in the LuxCore scene.
+    """
+    # Names handed out since the last reset
+    names = set()
+    # How often an already known definition was exported again
+    reused = 0
+    # Final renders export on their own thread, so the viewport keeps its own setting
+    _local = threading.local()
+
+    @classmethod
+    def is_enabled(cls):
+        return getattr(cls._local, "enabled", False)
+
+    @classmethod
+    def get_name(cls, definitions):
+        content = repr(sorted(definitions.items())).encode("utf-8")
+        luxcore_name = "__tex_" + hashlib.sha1(content).hexdigest()
+
+        if luxcore_name in cls.names:
+            cls.reused += 1
+        else:
+            cls.names.add(luxcore_name)
+        return luxcore_name
+
+    @classmethod
+    def reset(cls, enabled=False):
+        cls._local.enabled = enabled
+        cls.names = set()
+        cls.reused = 0
+
+
+class NodeTreeIndex(object):
+    """
+    This class is a singleton.
+    Caches the nodes of each node tree by bl_idname and the active output node,
+    so large node trees don't have to be scanned on every material export or update check.
+    The index is rebuilt when the node tree reports a change (see the update() methods
+    of the node tree classes) or when the number of nodes or the last node differ.
+    """
+    # {node tree key: (signature, {bl_idname: [node1, node2, ...]})}
+    indexes = {}
+    # {node tree key: active output node}
+    active_outputs = {}
+
+    @classmethod
+    def find_nodes(cls, node_tree, bl_idname):
+        return list(cls._get_index(node_tree).get(bl_idname, []))
+
+    @classmethod
+    def get_active_output(cls, node_tree, output_type):
+        key = node_tree.as_pointer()
+        # Validates the cached output as a side effect
+        outputs = cls._get_index(node_tree).get(output_type, [])
+
+        output = cls.active_outputs.get(key)
+        if output is not None and output.active:
+            return output
+
+        for node in outputs:
+            if node.active:
+                cls.active_outputs[key] = node
+                return node
+        return None
+
+    @classmethod
+    def invalidate(cls, node_tree):
+        key = node_tree.as_pointer()
+        cls.indexes.pop(key, None)
+        cls.active_outputs.pop(key, None)
+
+    @classmethod
+    def clear(cls):
+        cls.indexes.clear()
+        cls.active_outputs.clear()
+
+    @classmethod
+    def _get_index(cls, node_tree):
+        key = node_tree.as_pointer()
+        signature = _get_node_tree_signature(node_tree)
+
+        try:
+            cached_signature, index = cls.indexes[key]
+            if cached_signature == signature:
+                return index
+        except KeyError:
+            pass
+
+        index = {}
+        for node in node_tree.nodes:
+            index.setdefault(node.bl_idname, []).append(node)
+
+        cls.indexes[key] = (signature, index)
+        cls.active_outputs.pop(key, None)
+        return index
+
+
+def _get_node_tree_signature(node_tree):
+    # Cheap check for node changes that did not (yet) trigger an update of the node tree,
+    # e.g. nodes added by a script. New nodes are always appended at the end.
+    nodes = node_tree.nodes
+    return len(nodes), nodes[-1].as_pointer() if nodes else 0
+
+
+class NodeExportProfiler(object):
+    """
+    This class is a singleton.
+    Opt-in profiler for the node export (enabled in the LuxCore Export Profiler panel).
+    Records the time spent in the export methods of the nodes (excluding the time spent
+    in the nodes linked to their inputs) and the number of properties they define,
+    per node type and per material, world or camera volume.
+    """
+    enabled = False
+    # {bl_idname: [time, property count, calls]}
+    node_types = {}
+    # {material or node tree name: [time, property count, calls]}
+    node_trees = {}
+    # Time spent in linked nodes, one entry per node that is currently exported
+    _child_times = []
+    _node_tree = None
+
+    @classmethod
+    def reset(cls, enabled):
+        cls.enabled = enabled
+        cls.node_types = {}
+        cls.node_trees = {}
+        cls._child_times = []
+        cls._node_tree = None
+
+    @classmethod
+    def export_node(cls, node, props, luxcore_name=None):
+        args = (props, luxcore_name) if luxcore_name else (props,)
+        if not cls.enabled:
+            return node.export(*args)
+
+        cls._child_times.append(0)
+        start = time()
+        try:
+            return node.export(*args)
+        finally:
+            elapsed = time() - start
+            child_time = cls._child_times.pop()
+            if cls._child_times:
+                cls._child_times[-1] += elapsed
+            cls._add(cls.node_types, node.bl_idname, elapsed - child_time, 0, 1)
+
+    @classmethod
+    @contextmanager
+    def measure_node_tree(cls, name):
+        """ Use around the export of a material, world volume etc. """
+        if not cls.enabled:
+            yield
+            return
+
+        cls._node_tree = name
+        start = time()
+        try:
+            yield
+        finally:
+            cls._add(cls.node_trees, name, time() - start, 0, 1)
+            cls._node_tree = None
+
+    @classmethod
+    def add_props(cls, node, count):
+        """ Called from base_export() """
+        if not cls.enabled:
+            return
+        cls._add(cls.node_types, node.bl_idname, 0, count, 0)
+        if cls._node_tree:
+            cls._add(cls.node_trees, cls._node_tree, 0, count, 0)
+
+    @staticmethod
+    def _add(stats, key, elapsed, count, calls):
+        entry = stats.setdefault(key, [0, 0, 0])
+        entry[0] += elapsed
+        entry[1] += count
+        entry[2] += calls
+
+
 def find_nodes(node_tree, bl_idname):
-    return [node for node in node_tree.nodes if node.bl_idname == bl_idname]
+    return NodeTreeIndex.find_nodes(node_tree, bl_idname)
 
 
 def update_opengl_materials(_, context):